@@ -63,7 +63,7 @@ def configure_logging(app):
         app (Flask): Flask application instance
     """
     # Ensure log directory exists
-    log_dir = os.path.join(os.path.dirname(__file__), '..', 'logs')
+    log_dir = app.config['LOG_FOLDER']
     os.makedirs(log_dir, exist_ok=True)
     
     # Create a file handler
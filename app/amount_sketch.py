@@ -0,0 +1,219 @@
+#amount_sketch.py
+import json
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+class AmountSketch:
+    """
+    Mergeable DDSketch-style quantile sketch over transaction amounts.
+
+    Values are counted in logarithmically sized buckets so every quantile
+    is answered within ``relative_accuracy`` of the true value, using
+    memory proportional to the spread of the amounts rather than their count.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+
+        self.positive_bins: Dict[int, int] = {}
+        self.negative_bins: Dict[int, int] = {}
+        self.zero_count = 0
+
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Record ``value`` ``count`` times."""
+        if value > 0:
+            key = self._key(value)
+            self.positive_bins[key] = self.positive_bins.get(key, 0) + count
+        elif value < 0:
+            key = self._key(-value)
+            self.negative_bins[key] = self.negative_bins.get(key, 0) + count
+        else:
+            self.zero_count += count
+
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'AmountSketch'):
+        """Fold ``other`` into this sketch in place."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+
+        for key, count in other.positive_bins.items():
+            self.positive_bins[key] = self.positive_bins.get(key, 0) + count
+        for key, count in other.negative_bins.items():
+            self.negative_bins[key] = self.negative_bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _ordered_bins(self):
+        """Yield (representative value, count) pairs in ascending value order."""
+        for key in sorted(self.negative_bins, reverse=True):
+            yield -self._value(key), self.negative_bins[key]
+        if self.zero_count:
+            yield 0.0, self.zero_count
+        for key in sorted(self.positive_bins):
+            yield self._value(key), self.positive_bins[key]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the approximate value at quantile ``q`` (0 <= q <= 1)."""
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, count in self._ordered_bins():
+            seen += count
+            if seen > rank:
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def histogram(self, bucket_count: int = 10) -> List[Dict]:
+        """Spread the recorded amounts over equal-width buckets between min and max."""
+        if self.count == 0 or bucket_count < 1:
+            return []
+
+        width = (self.max - self.min) / bucket_count
+        buckets = [
+            {
+                'lower': self.min + i * width,
+                'upper': self.min + (i + 1) * width,
+                'count': 0
+            } for i in range(bucket_count)
+        ]
+
+        for value, count in self._ordered_bins():
+            value = min(max(value, self.min), self.max)
+            index = int((value - self.min) / width) if width else 0
+            buckets[min(index, bucket_count - 1)]['count'] += count
+
+        return buckets
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict:
+        """Summary statistics for API serialization."""
+        return {
+            'count': self.count,
+            'total_amount': self.total,
+            'min_amount': self.min if self.count else 0,
+            'max_amount': self.max if self.count else 0,
+            'avg_amount': self.total / self.count if self.count else 0,
+            'quantiles': {
+                f"p{round(q * 100, 2):g}": self.quantile(q) for q in quantiles
+            }
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive_bins': {str(k): v for k, v in self.positive_bins.items()},
+            'negative_bins': {str(k): v for k, v in self.negative_bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AmountSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.positive_bins = {int(k): v for k, v in data['positive_bins'].items()}
+        sketch.negative_bins = {int(k): v for k, v in data['negative_bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.total = data['total']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+def merge_sketch_sets(target: Dict[str, Dict[str, AmountSketch]],
+                      other: Dict[str, Dict[str, AmountSketch]]) -> Dict[str, Dict[str, AmountSketch]]:
+    """
+    Merge grouped sketches (e.g. ``{'by_category': {...}, 'by_month': {...}}``)
+    from another chunk or process into ``target``.
+    """
+    for group, sketches in other.items():
+        target_group = target.setdefault(group, {})
+        for key, sketch in sketches.items():
+            if key in target_group:
+                target_group[key].merge(sketch)
+            else:
+                target_group[key] = AmountSketch.from_dict(sketch.to_dict())
+    return target
+
+
+def save_sketch_sets(sketch_sets: Dict[str, Dict[str, AmountSketch]], filename: str):
+    """Persist grouped sketches to a JSON file."""
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump({
+            group: {key: sketch.to_dict() for key, sketch in sketches.items()}
+            for group, sketches in sketch_sets.items()
+        }, f)
+    os.replace(tmp_filename, filename)
+
+
+def load_sketch_sets(filename: str) -> Dict[str, Dict[str, AmountSketch]]:
+    """Load grouped sketches written by ``save_sketch_sets``."""
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        group: {key: AmountSketch.from_dict(sketch) for key, sketch in sketches.items()}
+        for group, sketches in data.items()
+    }
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def open_sketch_sets(filename: str) -> Dict[str, Dict[str, AmountSketch]]:
+    """
+    Return the process-wide sketches for ``filename``, reloading them only when
+    the file has been replaced by a newer ingest. Empty if it does not exist.
+
+    The returned sketches are shared; callers must not modify them.
+    """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return {}
+    version = (stat.st_ino, stat.st_mtime_ns)
+
+    with _shared_lock:
+        cached = _shared.get(filename)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        sketch_sets = load_sketch_sets(filename)
+        _shared[filename] = (version, sketch_sets)
+        return sketch_sets
@@ -0,0 +1,109 @@
+#balance_index.py
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class BalanceIndex:
+    """
+    Time-sorted account balance index built at ingestion time.
+
+    Balances are kept in parallel arrays ordered by timestamp so point-in-time
+    and range lookups are binary searches instead of scans over raw messages.
+    """
+
+    def __init__(self, timestamps: Optional[List[datetime]] = None,
+                 balances: Optional[List[float]] = None):
+        self.timestamps = timestamps or []
+        self.balances = balances or []
+
+    @classmethod
+    def from_transactions(cls, transactions) -> 'BalanceIndex':
+        """Build the index from transactions that reported a balance."""
+        points = sorted(
+            ((t.date_time, t.balance) for t in transactions if t.balance is not None),
+            key=lambda point: point[0]
+        )
+        return cls([p[0] for p in points], [p[1] for p in points])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def as_of(self, timestamp: datetime) -> Optional[Dict]:
+        """Return the last known balance at or before ``timestamp``."""
+        position = bisect_right(self.timestamps, timestamp)
+        if position == 0:
+            return None
+        return {
+            'date_time': self.timestamps[position - 1].isoformat(),
+            'balance': self.balances[position - 1]
+        }
+
+    def between(self, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> List[Dict]:
+        """Return every balance point with ``start <= date_time <= end``."""
+        low = bisect_left(self.timestamps, start) if start else 0
+        high = bisect_right(self.timestamps, end) if end else len(self.timestamps)
+        return [
+            {
+                'date_time': self.timestamps[i].isoformat(),
+                'balance': self.balances[i]
+            } for i in range(low, high)
+        ]
+
+    def merge(self, other: 'BalanceIndex') -> 'BalanceIndex':
+        """Return a new index holding the points of both indexes in time order."""
+        points = sorted(
+            zip(self.timestamps + other.timestamps, self.balances + other.balances),
+            key=lambda point: point[0]
+        )
+        return BalanceIndex([p[0] for p in points], [p[1] for p in points])
+
+    def save(self, filename: str):
+        """Persist the index to a JSON file."""
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamps': [t.isoformat() for t in self.timestamps],
+                'balances': self.balances
+            }, f)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> Optional['BalanceIndex']:
+        """Load an index written by ``save``; ``None`` if it does not exist."""
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            [datetime.fromisoformat(t) for t in data['timestamps']],
+            data['balances']
+        )
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def open_balance_index(filename: str) -> Optional[BalanceIndex]:
+    """
+    Return the process-wide index for ``filename``, reloading it only when the
+    file has been replaced by a newer ingest. ``None`` if it does not exist.
+    """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    version = (stat.st_ino, stat.st_mtime_ns)
+
+    with _shared_lock:
+        cached = _shared.get(filename)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = BalanceIndex.load(filename)
+        _shared[filename] = (version, index)
+        return index
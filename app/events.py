@@ -0,0 +1,119 @@
+#events.py
+import json
+import queue
+import threading
+from typing import Dict, Optional
+
+
+class EventBroker:
+    """
+    In-process fan-out of dashboard events to server-sent-event subscribers.
+
+    Each subscriber gets a bounded queue; a subscriber that falls behind has
+    its backlog dropped and receives a single ``resync`` event telling the
+    client to re-fetch instead of applying deltas.
+    """
+
+    def __init__(self, max_backlog: int = 100):
+        self.max_backlog = max_backlog
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.max_backlog)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event: str, data: Dict):
+        with self.lock:
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(('resync', {}))
+
+    def stream(self, subscriber: queue.Queue, keepalive: float = 15.0):
+        """Yield SSE frames for ``subscriber`` until the client disconnects."""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def aggregate_deltas(added, removed=(), income_categories=(), expense_categories=()) -> Dict:
+    """
+    Per-category and per-month count/sum changes for a batch of ingested rows
+
+    Args:
+        added (iterable): (category, date_time, amount) for rows added
+        removed (iterable): (category, date_time, amount) for rows replaced
+        income_categories (iterable): Categories counted as income
+        expense_categories (iterable): Categories counted as expenses
+
+    Returns:
+        dict: category_deltas and monthly_deltas lists
+    """
+    categories: Dict[str, Dict] = {}
+    months: Dict[tuple, Dict] = {}
+
+    def apply(rows, sign):
+        for category, date_time, amount in rows:
+            cat = categories.setdefault(category, {
+                'category': category,
+                'kind': _kind(category, income_categories, expense_categories),
+                'transaction_count': 0,
+                'total_amount': 0.0
+            })
+            cat['transaction_count'] += sign
+            cat['total_amount'] += sign * float(amount)
+
+            key = (date_time.year, date_time.month)
+            month = months.setdefault(key, {
+                'year': key[0],
+                'month': key[1],
+                'transaction_count': 0,
+                'total_amount': 0.0
+            })
+            month['transaction_count'] += sign
+            month['total_amount'] += sign * float(amount)
+
+    apply(added, 1)
+    apply(removed, -1)
+
+    return {
+        'category_deltas': [
+            d for d in categories.values()
+            if d['transaction_count'] or d['total_amount']
+        ],
+        'monthly_deltas': [
+            months[key] for key in sorted(months)
+            if months[key]['transaction_count'] or months[key]['total_amount']
+        ]
+    }
+
+
+def _kind(category: str, income_categories, expense_categories) -> Optional[str]:
+    if category in income_categories:
+        return 'income'
+    if category in expense_categories:
+        return 'expense'
+    return None
+
+
+broker = EventBroker()
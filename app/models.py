@@ -1,8 +1,76 @@
 from app import db
-from sqlalchemy import func, Column, Integer, String, DateTime, Text
+from flask import current_app
+from sqlalchemy import func, event, text, Column, Integer, String, DateTime, Text, UniqueConstraint
 from sqlalchemy.dialects.mysql import DECIMAL
 from datetime import datetime
 
+
+def month_partition(year, month):
+    """
+    Build the RANGE partition definition holding a single month
+    
+    Args:
+        year (int): Partition year
+        month (int): Partition month
+    
+    Returns:
+        str: Partition definition for use in PARTITION BY / REORGANIZE
+    """
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (
+        f"PARTITION p{year}{month:02d} "
+        f"VALUES LESS THAN (TO_DAYS('{next_year}-{next_month:02d}-01'))"
+    )
+
+
+def month_range(start_month, count):
+    """
+    List ``count`` consecutive (year, month) pairs starting at ``start_month``
+    
+    Args:
+        start_month (str): First month as YYYY-MM
+        count (int): Number of months
+    
+    Returns:
+        list: (year, month) tuples
+    """
+    year, month = (int(part) for part in start_month.split('-'))
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def missing_month_partitions(partition_names, months):
+    """
+    List the months that need their own partition so every month up to the
+    latest of ``months`` is covered, filling gaps after the newest existing
+    monthly partition
+    
+    Args:
+        partition_names (iterable): Existing partition names (pYYYYMM and p_future)
+        months (iterable): (year, month) tuples that will receive data
+    
+    Returns:
+        list: (year, month) tuples, oldest first
+    """
+    months = set(months)
+    if not months:
+        return []
+    
+    monthly = sorted(name for name in partition_names if name and name != 'p_future')
+    last_year, last_month = max(months)
+    if monthly:
+        year, month = int(monthly[-1][1:5]), int(monthly[-1][5:7])
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    else:
+        year, month = min(months)
+    
+    count = (last_year * 12 + last_month) - (year * 12 + month) + 1
+    return month_range(f"{year}-{month:02d}", count) if count > 0 else []
+
+
 class Transaction(db.Model):
     """
     Transaction model representing financial transactions
@@ -10,10 +78,17 @@ class Transaction(db.Model):
     # Explicitly set the table name to match the existing database table
     __tablename__ = 'transaction'
     
-    # Use __table_args__ to handle existing table
-    __table_args__ = {'extend_existing': True}
+    # Use __table_args__ to handle existing table. The table is range
+    # partitioned by month on date_time, so MySQL requires date_time in
+    # every unique key.
+    __table_args__ = (
+        UniqueConstraint('transaction_id', 'date_time', name='uq_transaction_id_date_time'),
+        {'extend_existing': True}
+    )
 
-    # Primary key
+    # Primary key. On MySQL the after_create hook widens it to
+    # (id, date_time), since date_time is the partitioning column; other
+    # engines keep a single auto-incrementing id.
     id = Column(Integer, primary_key=True)
 
     # Transaction details
@@ -25,8 +100,12 @@ class Transaction(db.Model):
     sender = Column(String(100), index=True)
     receiver = Column(String(100), index=True)
     
+    # Account balance after the transaction and fee charged
+    balance = Column(DECIMAL(15, 2))
+    fee = Column(DECIMAL(15, 2))
+    
     # Additional transaction metadata
-    transaction_id = Column(String(50), unique=True, index=True)
+    transaction_id = Column(String(50), index=True)
     raw_message = Column(Text)
     
     # Timestamp for record creation
@@ -50,11 +129,56 @@ class Transaction(db.Model):
             'amount': float(self.amount) if self.amount is not None else None,
             'sender': self.sender,
             'receiver': self.receiver,
+            'balance': float(self.balance) if self.balance is not None else None,
+            'fee': float(self.fee) if self.fee is not None else None,
             'transaction_id': self.transaction_id,
             'raw_message': self.raw_message,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+    @classmethod
+    def ensure_month_partitions(cls, months):
+        """
+        Split the catch-all partition so every month up to the latest of
+        ``months`` has its own partition
+        
+        Months between the newest existing monthly partition and the latest
+        requested month are filled in as well, so ranges stay contiguous.
+        Older months are already covered by an existing range. No-op on
+        engines without partitioning, and on a MySQL table that has not been
+        partitioned yet (see migrate_partitions.sql).
+        
+        Args:
+            months (iterable): (year, month) tuples that will receive data
+        """
+        months = set(months)
+        if not months or db.engine.dialect.name != 'mysql':
+            return
+        
+        existing = [
+            row[0] for row in db.session.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ), {'table': cls.__tablename__})
+        ]
+        if 'p_future' not in existing:
+            current_app.logger.warning(
+                f"Table {cls.__tablename__} is not partitioned by month; "
+                f"apply migrate_partitions.sql"
+            )
+            return
+        
+        missing = missing_month_partitions(existing, months)
+        if not missing:
+            return
+        
+        db.session.execute(text(
+            f"ALTER TABLE `{cls.__tablename__}` REORGANIZE PARTITION p_future INTO ("
+            + ", ".join(month_partition(y, m) for y, m in missing)
+            + ", PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        ))
+        db.session.commit()
+
     @classmethod
     def get_category_summary(cls, start_date=None, end_date=None):
         """
@@ -143,4 +267,28 @@ class Transaction(db.Model):
             'WITHDRAWALS_FROM_AGENTS',
             'BANK_TRANSFERS',
             'BUNDLES'
-        ]
\ No newline at end of file
+        ]
+
+
+@event.listens_for(Transaction.__table__, 'after_create')
+def partition_transaction_table(target, connection, **kw):
+    """
+    Range partition a freshly created transaction table by month (MySQL only)
+    """
+    if connection.dialect.name != 'mysql':
+        return
+    
+    # MySQL requires the partitioning column in every unique key
+    connection.execute(text(
+        f"ALTER TABLE `{target.name}` DROP PRIMARY KEY, ADD PRIMARY KEY (id, date_time)"
+    ))
+    
+    months = month_range(
+        current_app.config.get('TRANSACTION_PARTITION_START', '2024-01'),
+        current_app.config.get('TRANSACTION_PARTITION_MONTHS', 36)
+    )
+    connection.execute(text(
+        f"ALTER TABLE `{target.name}` PARTITION BY RANGE (TO_DAYS(date_time)) ("
+        + ", ".join(month_partition(year, month) for year, month in months)
+        + ", PARTITION p_future VALUES LESS THAN MAXVALUE)"
+    ))
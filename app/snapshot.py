@@ -0,0 +1,419 @@
+#snapshot.py
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+MAGIC = b"MOMOSNP1"
+VERSION = 2
+EPOCH = datetime(1970, 1, 1)
+
+# Per-row columns in timestamp order; sender, receiver and transaction_id
+# index the string table and message indexes the message table
+ROW_COLUMNS = (
+    ('timestamp', 'q'), ('month', 'i'), ('amount', 'd'), ('category', 'B'),
+    ('sender', 'i'), ('receiver', 'i'), ('transaction_id', 'i'),
+    ('balance', 'd'), ('fee', 'd'), ('message', 'i')
+)
+
+
+def _to_epoch(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds())
+
+
+def _from_epoch(seconds: int) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def _month_key(value: datetime) -> int:
+    return value.year * 12 + value.month - 1
+
+
+def _padding(length: int) -> bytes:
+    return b"\0" * (-length % 8)
+
+
+class _Table:
+    """Append-only table of UTF-8 strings addressed by their position."""
+
+    def __init__(self, offsets: Optional[memoryview] = None, data: Optional[memoryview] = None):
+        self.offsets = array('Q', [0])
+        self.data = bytearray()
+        if offsets is not None:
+            self.offsets = array('Q')
+            self.offsets.frombytes(offsets.tobytes())
+            self.data = bytearray(data)
+        self.ids: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, value: str) -> int:
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+        return len(self) - 1
+
+    def intern(self, value: Optional[str]) -> int:
+        """Append ``value`` once per write; -1 for None."""
+        if value is None:
+            return -1
+        if value not in self.ids:
+            self.ids[value] = self.append(value)
+        return self.ids[value]
+
+
+def _new_columns(rows, category_codes: Dict[str, int], strings: _Table, messages: _Table) -> Dict[str, array]:
+    return {
+        'timestamp': array('q', (_to_epoch(t.date_time) for t in rows)),
+        'month': array('i', (_month_key(t.date_time) for t in rows)),
+        'amount': array('d', (t.amount for t in rows)),
+        'category': array('B', (category_codes[t.category] for t in rows)),
+        'sender': array('i', (strings.intern(t.sender) for t in rows)),
+        'receiver': array('i', (strings.intern(t.receiver) for t in rows)),
+        'transaction_id': array('i', (strings.intern(t.transaction_id) for t in rows)),
+        'balance': array('d', (math.nan if t.balance is None else t.balance for t in rows)),
+        'fee': array('d', (math.nan if t.fee is None else t.fee for t in rows)),
+        'message': array('i', (messages.append(t.raw_message) for t in rows))
+    }
+
+
+def _write(filename: str, count: int, categories: List[str], columns: Dict[str, bytes],
+           strings: _Table, messages: _Table):
+    sections = [(name, typecode, columns[name]) for name, typecode in ROW_COLUMNS]
+    sections += [
+        ('string_offsets', 'Q', strings.offsets.tobytes()),
+        ('string_data', 'B', bytes(strings.data)),
+        ('message_offsets', 'Q', messages.offsets.tobytes()),
+        ('message_data', 'B', bytes(messages.data))
+    ]
+
+    # Lay out every section at an 8-byte aligned offset after the header
+    layout = {}
+    offset = 0
+    for name, typecode, data in sections:
+        layout[name] = {'format': typecode, 'offset': offset, 'size': len(data)}
+        offset += len(data) + len(_padding(len(data)))
+
+    header = json.dumps({
+        'version': VERSION,
+        'count': count,
+        'string_count': len(strings),
+        'message_count': len(messages),
+        'categories': categories,
+        'sections': layout
+    }).encode('utf-8')
+    header += _padding(len(MAGIC) + 8 + len(header))
+
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, typecode, data in sections:
+            f.write(data)
+            f.write(_padding(len(data)))
+    os.replace(tmp_filename, filename)
+
+
+def write_snapshot(transactions, filename: str):
+    """
+    Write transactions to a columnar binary snapshot.
+
+    Rows are sorted by timestamp and stored as fixed-width columns; sender,
+    receiver and transaction id reference a shared string table and raw
+    messages a message table. The file is written to a temporary path and
+    swapped in, so readers mapping the old file keep a consistent view.
+    """
+    rows = sorted(transactions, key=lambda t: t.date_time)
+    categories = sorted({t.category for t in rows})
+    strings, messages = _Table(), _Table()
+    columns = _new_columns(
+        rows, {category: code for code, category in enumerate(categories)}, strings, messages
+    )
+    _write(
+        filename, len(rows), categories,
+        {name: column.tobytes() for name, column in columns.items()}, strings, messages
+    )
+
+
+def update_snapshot(transactions, filename: str, replace_months=()) -> int:
+    """
+    Merge transactions into an existing snapshot, first dropping the rows of
+    ``replace_months`` (``YYYY-MM`` strings). Writes a new snapshot if none
+    exists.
+
+    Existing rows are copied a column slice at a time and the string and
+    message tables are only appended to, so only the new rows are encoded.
+    Once dropped rows leave most of the message table unreferenced, the
+    snapshot is rewritten from its remaining rows. Returns the new row count.
+    """
+    if not os.path.exists(filename):
+        write_snapshot(transactions, filename)
+        return len(transactions)
+
+    base = TransactionSnapshot(filename)
+    rows = sorted(transactions, key=lambda t: t.date_time)
+    categories = sorted(set(base.categories) | {t.category for t in rows})
+    category_codes = {category: code for code, category in enumerate(categories)}
+
+    # Base rows of the replaced months form one contiguous range per month
+    dropped = []
+    for month in sorted(set(replace_months)):
+        year, number = (int(part) for part in month.split('-'))
+        key = year * 12 + number - 1
+        low, high = bisect_left(base.months, key), bisect_right(base.months, key)
+        if low < high:
+            dropped.append((low, high))
+
+    def kept(low: int, high: int):
+        for drop_low, drop_high in dropped:
+            if drop_low >= high:
+                break
+            if drop_high > low:
+                if low < drop_low:
+                    yield low, drop_low
+                low = max(low, drop_high)
+        if low < high:
+            yield low, high
+
+    # Interleave base row ranges with new rows in timestamp order; new rows
+    # go after base rows with the same timestamp
+    pieces = []
+    cursor = 0
+    for i, trans in enumerate(rows):
+        position = bisect_right(base.timestamps, _to_epoch(trans.date_time))
+        pieces.extend(kept(cursor, position))
+        pieces.append(i)
+        cursor = position
+    pieces.extend(kept(cursor, base.count))
+
+    strings = _Table(base.sections['string_offsets'], base.sections['string_data'])
+    messages = _Table(base.sections['message_offsets'], base.sections['message_data'])
+    new = _new_columns(rows, category_codes, strings, messages)
+
+    # Remap base category codes when new categories shift the sorted order
+    remap = bytes(category_codes[category] for category in base.categories)
+    remap += bytes(256 - len(remap))
+
+    count = len(rows) + sum(piece[1] - piece[0] for piece in pieces if isinstance(piece, tuple))
+    if len(messages) > 2 * max(count, 1024):
+        return _compact(base, rows, pieces, filename)
+
+    columns = {}
+    for name, typecode in ROW_COLUMNS:
+        column = base.sections[name]
+        data = bytearray()
+        for piece in pieces:
+            if isinstance(piece, tuple):
+                chunk = column[piece[0]:piece[1]].tobytes()
+                data += chunk.translate(remap) if name == 'category' else chunk
+            else:
+                data += new[name][piece:piece + 1].tobytes()
+        columns[name] = bytes(data)
+
+    _write(filename, count, categories, columns, strings, messages)
+    return count
+
+
+def _compact(base: 'TransactionSnapshot', rows, pieces, filename: str) -> int:
+    """Rewrite the snapshot with only the rows still referenced."""
+    merged = []
+    for piece in pieces:
+        if isinstance(piece, tuple):
+            merged.extend(base.record(i) for i in range(*piece))
+        else:
+            merged.append(rows[piece])
+    write_snapshot(merged, filename)
+    return len(merged)
+
+
+class TransactionSnapshot:
+    """
+    Read-only, memory-mapped view of a columnar transaction snapshot.
+
+    Columns are exposed as typed memoryviews over the mapping, so nothing is
+    copied into the process and every worker mapping the same file shares
+    the operating system's page cache.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filename} is not a transaction snapshot")
+
+        header_length = struct.unpack_from('<Q', self.map, len(MAGIC))[0]
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(self.map[header_start:header_start + header_length]).rstrip(b"\0"))
+        if header['version'] != VERSION:
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+
+        self.count = header['count']
+        self.categories = header['categories']
+
+        data_start = header_start + header_length
+        buffer = memoryview(self.map)
+        self.sections = {}
+        for name, section in header['sections'].items():
+            start = data_start + section['offset']
+            self.sections[name] = buffer[start:start + section['size']].cast(section['format'])
+
+        self.timestamps = self.sections['timestamp']
+        self.months = self.sections['month']
+        self.amounts = self.sections['amount']
+        self.category_codes = self.sections['category']
+
+    def _string(self, offsets, data, index: int) -> Optional[str]:
+        if index < 0:
+            return None
+        return bytes(data[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def _row_range(self, start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None) -> Tuple[int, int]:
+        low = bisect_left(self.timestamps, _to_epoch(start_date)) if start_date else 0
+        high = bisect_right(self.timestamps, _to_epoch(end_date)) if end_date else self.count
+        return low, high
+
+    def _message(self, index: int) -> str:
+        return self._string(
+            self.sections['message_offsets'], self.sections['message_data'],
+            self.sections['message'][index]
+        )
+
+    def record(self, index: int) -> SimpleNamespace:
+        """One row with the attributes of a processor ``TransactionData``."""
+        strings = (self.sections['string_offsets'], self.sections['string_data'])
+        balance = self.sections['balance'][index]
+        fee = self.sections['fee'][index]
+        return SimpleNamespace(
+            category=self.categories[self.category_codes[index]],
+            date_time=_from_epoch(self.timestamps[index]),
+            amount=self.amounts[index],
+            sender=self._string(*strings, self.sections['sender'][index]),
+            receiver=self._string(*strings, self.sections['receiver'][index]),
+            transaction_id=self._string(*strings, self.sections['transaction_id'][index]),
+            raw_message=self._message(index),
+            balance=None if math.isnan(balance) else balance,
+            fee=None if math.isnan(fee) else fee
+        )
+
+    def row(self, index: int) -> Dict:
+        """
+        Serialize one row in the same shape as ``Transaction.to_dict``. Rows
+        have no stable identity in the snapshot, so ``id`` is None.
+        """
+        record = self.record(index)
+        return {
+            'id': None,
+            'category': record.category,
+            'date_time': record.date_time.isoformat(),
+            'amount': record.amount,
+            'sender': record.sender,
+            'receiver': record.receiver,
+            'balance': record.balance,
+            'fee': record.fee,
+            'transaction_id': record.transaction_id,
+            'raw_message': record.raw_message,
+            'created_at': None
+        }
+
+    def filter(self, category: Optional[str] = None,
+               start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None,
+               min_amount: Optional[float] = None,
+               max_amount: Optional[float] = None) -> List[int]:
+        """Return matching row indices, most recent first."""
+        if category is not None and category not in self.categories:
+            return []
+        code = self.categories.index(category) if category is not None else None
+
+        low, high = self._row_range(start_date, end_date)
+        return [
+            i for i in range(high - 1, low - 1, -1)
+            if (code is None or self.category_codes[i] == code)
+            and (min_amount is None or self.amounts[i] >= min_amount)
+            and (max_amount is None or self.amounts[i] <= max_amount)
+        ]
+
+    def search(self, term: str) -> List[int]:
+        """
+        Return indices of rows whose sender, receiver, category or raw
+        message contains ``term``, ignoring case, most recent first.
+        """
+        term = term.lower()
+        codes = {code for code, category in enumerate(self.categories) if term in category.lower()}
+        offsets, data = self.sections['string_offsets'], self.sections['string_data']
+        names = {
+            i for i in range(len(offsets) - 1)
+            if term in self._string(offsets, data, i).lower()
+        }
+        senders, receivers = self.sections['sender'], self.sections['receiver']
+        return [
+            i for i in range(self.count - 1, -1, -1)
+            if self.category_codes[i] in codes
+            or senders[i] in names or receivers[i] in names
+            or term in self._message(i).lower()
+        ]
+
+    def category_summary(self, start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None) -> List[Tuple[str, int, float]]:
+        """(category, transaction_count, total_amount) rows, as ``Transaction.get_category_summary``."""
+        counts = [0] * len(self.categories)
+        totals = [0.0] * len(self.categories)
+        low, high = self._row_range(start_date, end_date)
+        for i in range(low, high):
+            code = self.category_codes[i]
+            counts[code] += 1
+            totals[code] += self.amounts[i]
+        return [
+            (category, counts[code], totals[code])
+            for code, category in enumerate(self.categories) if counts[code]
+        ]
+
+    def monthly_summary(self, start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None) -> List[Tuple[int, int, float, int]]:
+        """(year, month, total_amount, transaction_count) rows, as ``Transaction.get_monthly_summary``."""
+        months: Dict[int, List] = {}
+        low, high = self._row_range(start_date, end_date)
+        for i in range(low, high):
+            month = months.setdefault(self.months[i], [0.0, 0])
+            month[0] += self.amounts[i]
+            month[1] += 1
+        return [
+            (key // 12, key % 12 + 1, total, count)
+            for key, (total, count) in sorted(months.items())
+        ]
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def open_snapshot(filename: str) -> Optional[TransactionSnapshot]:
+    """
+    Return the process-wide snapshot for ``filename``, remapping it when the
+    file has been replaced by a newer ingest. ``None`` if it does not exist.
+    """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    version = (stat.st_ino, stat.st_mtime_ns)
+
+    with _shared_lock:
+        cached = _shared.get(filename)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        snapshot = TransactionSnapshot(filename)
+        # The previous mapping is released once requests still using it finish
+        _shared[filename] = (version, snapshot)
+        return snapshot
@@ -4,6 +4,18 @@ document.addEventListener('DOMContentLoaded', () => {
     let currentPage = 1;
     let totalPages = 1;
 
+    // Whether the transactions table shows the unfiltered first page,
+    // so streamed transactions can be prepended to it
+    let liveTableUpdates = true;
+
+    // Overview aggregates kept current by streamed deltas
+    const overviewState = {
+        totalIncome: 0,
+        expenseSum: 0,
+        categorySummary: [],
+        monthlySummary: []
+    };
+
     // Debug logging function
     const debugLog = (message, data) => {
         console.log(`[Dashboard Debug] ${message}`, data);
@@ -56,6 +68,7 @@ document.addEventListener('DOMContentLoaded', () => {
         monthlyChart: document.getElementById('monthly-chart'),
         incomeExpenseChart: document.getElementById('income-expense-chart'),
         topCategoriesChart: document.getElementById('top-categories-chart'),
+        balanceChart: document.getElementById('balance-chart'),
         
         // Transactions Section
         searchInput: document.getElementById('search-input'),
@@ -132,13 +145,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 top_spending_categories: data.top_spending_categories || []
             };
 
+            // Keep aggregates for applying streamed deltas
+            overviewState.totalIncome = safeData.total_income;
+            overviewState.expenseSum = safeData.net_balance - safeData.total_income;
+            overviewState.categorySummary = safeData.category_summary;
+            overviewState.monthlySummary = safeData.monthly_summary;
+
             // Update summary cards
-            if (elements.totalIncome) 
-                elements.totalIncome.textContent = formatCurrency(safeData.total_income);
-            if (elements.totalExpenses) 
-                elements.totalExpenses.textContent = formatCurrency(safeData.total_expenses);
-            if (elements.netBalance) 
-                elements.netBalance.textContent = formatCurrency(safeData.net_balance);
+            updateSummaryCards();
 
             // Render Charts with null checks
             if (safeData.category_summary.length > 0) {
@@ -176,6 +190,114 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    // Summary Cards Update
+    const updateSummaryCards = () => {
+        if (elements.totalIncome) 
+            elements.totalIncome.textContent = formatCurrency(overviewState.totalIncome);
+        if (elements.totalExpenses) 
+            elements.totalExpenses.textContent = formatCurrency(Math.abs(overviewState.expenseSum));
+        if (elements.netBalance) 
+            elements.netBalance.textContent = formatCurrency(overviewState.totalIncome + overviewState.expenseSum);
+    };
+
+    // Update an existing chart's data in place, or render it if missing
+    const updateChartData = (chartElement, labels, values, render) => {
+        if (chartElement && chartElement.chart) {
+            chartElement.chart.data.labels = labels;
+            chartElement.chart.data.datasets[0].data = values;
+            chartElement.chart.update();
+        } else {
+            render();
+        }
+    };
+
+    // Apply a streamed ingest event to the overview and transactions table
+    const applyIngestEvent = (event) => {
+        debugLog('Applying ingest event', event);
+
+        (event.category_deltas || []).forEach(delta => {
+            if (delta.kind === 'income') {
+                overviewState.totalIncome += delta.total_amount;
+            } else if (delta.kind === 'expense') {
+                overviewState.expenseSum += delta.total_amount;
+
+                let entry = overviewState.categorySummary.find(cat => cat.category === delta.category);
+                if (!entry) {
+                    entry = { category: delta.category, total_amount: 0, transaction_count: 0 };
+                    overviewState.categorySummary.push(entry);
+                }
+                entry.total_amount += delta.total_amount;
+                entry.transaction_count += delta.transaction_count;
+            }
+        });
+
+        (event.monthly_deltas || []).forEach(delta => {
+            let entry = overviewState.monthlySummary.find(m => m.year === delta.year && m.month === delta.month);
+            if (!entry) {
+                entry = { year: delta.year, month: delta.month, total_amount: 0, transaction_count: 0 };
+                overviewState.monthlySummary.push(entry);
+            }
+            entry.total_amount += delta.total_amount;
+            entry.transaction_count += delta.transaction_count;
+        });
+
+        overviewState.categorySummary = overviewState.categorySummary
+            .filter(cat => cat.transaction_count > 0)
+            .sort((a, b) => b.total_amount - a.total_amount);
+        overviewState.monthlySummary = overviewState.monthlySummary
+            .filter(m => m.transaction_count > 0)
+            .sort((a, b) => (a.year - b.year) || (a.month - b.month));
+
+        updateSummaryCards();
+        updateChartData(
+            elements.categoryChart,
+            overviewState.categorySummary.map(cat => cat.category),
+            overviewState.categorySummary.map(cat => Math.abs(cat.total_amount)),
+            () => renderCategoryChart(overviewState.categorySummary)
+        );
+        updateChartData(
+            elements.monthlyChart,
+            overviewState.monthlySummary.map(m => `${m.year}-${m.month}`),
+            overviewState.monthlySummary.map(m => Math.abs(m.total_amount)),
+            () => renderMonthlyChart(overviewState.monthlySummary)
+        );
+
+        // Prepend new transactions to the unfiltered first page
+        if (liveTableUpdates && elements.transactionsBody && event.transactions && event.transactions.length > 0) {
+            const rows = event.transactions
+                .sort((a, b) => new Date(b.date_time) - new Date(a.date_time))
+                .map(trans => `
+            <tr>
+                <td>${formatDate(trans.date_time)}</td>
+                <td>${trans.category}</td>
+                <td>${formatCurrency(trans.amount)}</td>
+                <td>${trans.sender || 'N/A'}</td>
+                <td>${trans.receiver || 'N/A'}</td>
+            </tr>
+        `).join('');
+            elements.transactionsBody.insertAdjacentHTML('afterbegin', rows);
+            while (elements.transactionsBody.rows.length > 10) {
+                elements.transactionsBody.deleteRow(-1);
+            }
+        }
+    };
+
+    // Subscribe to server-sent dashboard updates
+    const connectUpdateStream = () => {
+        if (!window.EventSource) {
+            console.warn('Server-sent events not supported; live updates disabled');
+            return;
+        }
+
+        const source = new EventSource(`${API_BASE_URL}/stream`);
+        source.addEventListener('ingest', (e) => applyIngestEvent(JSON.parse(e.data)));
+        source.addEventListener('resync', () => {
+            fetchFinancialOverview();
+            if (liveTableUpdates) fetchTransactions();
+        });
+        source.onerror = (error) => debugLog('Update stream error', error);
+    };
+
     // Category Chart Rendering
     const renderCategoryChart = (categorySummary) => {
         if (!elements.categoryChart || !categorySummary || categorySummary.length === 0) {
@@ -345,6 +467,66 @@ document.addEventListener('DOMContentLoaded', () => {
         renderChart(elements.topCategoriesChart, 'bar', chartData);
     };
 
+    // Balance History Chart Rendering
+    const renderBalanceChart = (balanceHistory) => {
+        if (!elements.balanceChart || !balanceHistory || balanceHistory.length === 0) {
+            console.warn('No balance history to render');
+            return;
+        }
+
+        debugLog('Rendering Balance Chart', balanceHistory);
+        
+        const chartData = {
+            data: {
+                labels: balanceHistory.map(point => formatDate(point.date_time)),
+                datasets: [{
+                    label: 'Balance',
+                    data: balanceHistory.map(point => point.balance),
+                    borderColor: '#36A2EB',
+                    backgroundColor: 'rgba(54, 162, 235, 0.2)',
+                    pointRadius: 0
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    title: {
+                        display: true,
+                        text: 'Balance Over Time'
+                    }
+                },
+                scales: {
+                    y: {
+                        beginAtZero: true,
+                        ticks: {
+                            callback: function(value) {
+                                return formatCurrency(value);
+                            }
+                        }
+                    }
+                }
+            }
+        };
+
+        renderChart(elements.balanceChart, 'line', chartData);
+    };
+
+    // Fetch Balance History
+    const fetchBalanceHistory = async () => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/balance`);
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const data = await response.json();
+            renderBalanceChart(data.balance_history || []);
+        } catch (error) {
+            console.error('Error fetching balance history:', error);
+        }
+    };
+
     // Transactions Table Rendering
     const renderTransactionsTable = (transactions) => {
         if (!elements.transactionsBody) return;
@@ -384,6 +566,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
             // Render transactions
             renderTransactionsTable(data.transactions);
+            liveTableUpdates = page === 1 && Object.keys(filters).length === 0;
 
             // Update pagination
             currentPage = data.current_page;
@@ -414,6 +597,7 @@ document.addEventListener('DOMContentLoaded', () => {
             
             const data = await response.json();
             renderTransactionsTable(data.transactions);
+            liveTableUpdates = false;
             
             // Update pagination
             currentPage = data.current_page;
@@ -528,6 +712,10 @@ const initializeDashboard = async () => {
     // Fetch initial data
     await fetchFinancialOverview();
     await fetchTransactions();
+    await fetchBalanceHistory();
+
+    // Apply incremental updates instead of polling
+    connectUpdateStream();
 };
 
 // Start the dashboard
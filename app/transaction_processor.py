@@ -4,9 +4,31 @@ import re
 from datetime import datetime
 import json
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from app.amount_sketch import AmountSketch, save_sketch_sets, load_sketch_sets, merge_sketch_sets
+from app.balance_index import BalanceIndex
+from app.snapshot import update_snapshot, write_snapshot
+
+SKETCH_FILENAME = "amount_sketches.json"
+BALANCE_INDEX_FILENAME = "balance_index.json"
+MANIFEST_FILENAME = "manifest.json"
+DEAD_LETTER_FILENAME = "dead_letter.ndjson"
+SNAPSHOT_FILENAME = "transactions.snapshot"
+INGEST_LOCK_FILENAME = ".ingest.lock"
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; only the in-process lock applies
+    fcntl = None
+
+# Masks every digit to "0" so template skeletons keep digit positions (and
+# therefore every \d match) while amounts, ids and timestamps collapse.
+DIGIT_MASK = str.maketrans("123456789", "000000000")
 
 @dataclass
 class TransactionData:
@@ -17,9 +39,115 @@ class TransactionData:
     receiver: Optional[str]
     transaction_id: Optional[str]
     raw_message: str
+    balance: Optional[float] = None
+    fee: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        """Serialize in the same shape as ``Transaction.to_dict``."""
+        return {
+            'id': None,
+            'category': self.category,
+            'date_time': self.date_time.isoformat(),
+            'amount': self.amount,
+            'sender': self.sender,
+            'receiver': self.receiver,
+            'balance': self.balance,
+            'fee': self.fee,
+            'transaction_id': self.transaction_id,
+            'raw_message': self.raw_message,
+            'created_at': None
+        }
+
+class IngestLock:
+    """
+    Reentrant lock serializing writes to an output directory, across threads
+    of this process and, where ``fcntl`` is available, across processes via
+    an exclusive ``flock`` on ``<output_dir>/.ingest.lock``.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, INGEST_LOCK_FILENAME)
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                self.file = open(self.path, 'a')
+                if fcntl is not None:
+                    fcntl.flock(self.file, fcntl.LOCK_EX)
+            except Exception:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
+
+
+_ingest_locks = {}
+_ingest_locks_guard = threading.Lock()
+
+
+def ingest_lock(output_dir: str) -> IngestLock:
+    """Return the process-wide lock for ``output_dir``."""
+    key = os.path.abspath(output_dir)
+    with _ingest_locks_guard:
+        if key not in _ingest_locks:
+            _ingest_locks[key] = IngestLock(key)
+        return _ingest_locks[key]
+
+
+def transaction_keys(transactions) -> List[Tuple]:
+    """
+    Identity of each transaction: ``(transaction_id, date_time)`` when the
+    message carries a TxId, otherwise ``(raw_message, n)`` where ``n``
+    counts the earlier transactions with the same message. Repeated
+    deliveries of one TxId collapse, genuinely repeated messages without
+    one (e.g. the same bundle bought twice) stay distinct, and the same
+    backup ingested again maps onto the same keys.
+    """
+    seen = {}
+    keys = []
+    for trans in transactions:
+        if trans.transaction_id:
+            keys.append(("transaction_id", trans.transaction_id, trans.date_time))
+            continue
+        n = seen.get(trans.raw_message, 0)
+        seen[trans.raw_message] = n + 1
+        keys.append(("raw_message", trans.raw_message, n))
+    return keys
+
+
+def record_to_transaction(category: str, record: Dict) -> TransactionData:
+    """Rebuild a TransactionData from a saved shard record."""
+    return TransactionData(
+        category=category,
+        date_time=datetime.fromisoformat(record["datetime"]),
+        amount=record["amount"],
+        sender=record["sender"],
+        receiver=record["receiver"],
+        transaction_id=record["transaction_id"],
+        raw_message=record["raw_message"],
+        balance=record.get("balance"),
+        fee=record.get("fee")
+    )
 
 class TransactionProcessor:
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", template_cache_size: int = 1024,
+                 dead_letter_batch_size: int = 100):
         self.categories = {
             "INCOMING_MONEY": r"(?!.*failed)(You have received \d+)|has been reversed",
             "CODE_PAYMENTS": r"(?!.*failed) Your payment | your payment",
@@ -36,8 +164,37 @@ class TransactionProcessor:
         self.category_patterns = {cat: re.compile(pattern, re.IGNORECASE) 
                                 for cat, pattern in self.categories.items()}
         
+        self.field_patterns = {
+            "amount": re.compile(r"(\d+(?:,\d+)?)\s*RWF"),
+            "date_time": re.compile(r"(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})"),
+            "transaction_id": re.compile(r"(?:Transaction Id:|TxId:)\s*(\d+)"),
+            "balance": re.compile(r"new balance\s*(?:is)?\s*:?\s*(\d+(?:,\d+)*)\s*RWF", re.IGNORECASE),
+            "fee": re.compile(r"fee (?:was|paid):?\s*(\d+(?:,\d+)*)\s*RWF", re.IGNORECASE)
+        }
+        
+        # Identifies the pattern set that produced a dead letter
+        self.pattern_version = hashlib.sha1(json.dumps({
+            "categories": self.categories,
+            "fields": {name: pattern.pattern for name, pattern in self.field_patterns.items()}
+        }, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        
+        # Messages quarantined in the current run, keyed by message
+        self.dead_letter_path = os.path.join(output_dir, DEAD_LETTER_FILENAME)
+        self.dead_letter_batch_size = dead_letter_batch_size
+        self.reset_dead_letters()
+        
+        # LRU cache of message skeleton -> (category, applicable field extractors)
+        self.template_cache = OrderedDict()
+        self.template_cache_size = template_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
+        
+        # Held while reading and rewriting the outputs
+        self.lock = ingest_lock(output_dir)
             
         logging.basicConfig(
             filename=f"{output_dir}/processing.log",
@@ -57,23 +214,76 @@ class TransactionProcessor:
             logging.error(f"XML parsing error: {e}")
             raise
         
+    def classify(self, message: str):
+        """
+        Resolve the category and the field extractors that match a message.
+
+        Results are memoized per template skeleton (the message with every
+        digit masked), so repeated templates skip the regex cascade.
+        """
+        skeleton = message.translate(DIGIT_MASK)
+        cached = self.template_cache.get(skeleton)
+        if cached is not None:
+            self.template_cache.move_to_end(skeleton)
+            self.cache_hits += 1
+            return cached
+        
+        self.cache_misses += 1
+        category = next((cat for cat, pattern in self.category_patterns.items() 
+                       if pattern.search(message)), "UNCATEGORIZED")
+        fields = frozenset(name for name, pattern in self.field_patterns.items()
+                           if pattern.search(message))
+        
+        if self.template_cache_size > 0:
+            self.template_cache[skeleton] = (category, fields)
+            if len(self.template_cache) > self.template_cache_size:
+                self.template_cache.popitem(last=False)
+                self.cache_evictions += 1
+        return category, fields
+
+    def cache_stats(self) -> Dict:
+        """Template cache counters, for sizing ``template_cache_size``."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'size': len(self.template_cache),
+            'capacity': self.template_cache_size,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'evictions': self.cache_evictions,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+
+    def _search_field(self, name: str, message: str, fields: frozenset):
+        return self.field_patterns[name].search(message) if name in fields else None
+        
     def extract_transaction_details(self, message: str) -> Optional[TransactionData]:
         """Extract transaction details from a message."""
         try:
-            # Determine category
-            category = next((cat for cat, pattern in self.category_patterns.items() 
-                           if pattern.search(message)), "UNCATEGORIZED")
+            # Determine category and which fields are present
+            category, fields = self.classify(message)
             
             # Extract amount
-            amount_match = re.search(r"(\d+(?:,\d+)?)\s*RWF", message)
+            amount_match = self._search_field("amount", message, fields)
             amount = float(amount_match.group(1).replace(",", "")) if amount_match else 0.0
             
             # Extract datetime
-            date_match = re.search(r"(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})", message)
-            date_time = datetime.strptime(date_match.group(1), "%Y-%m-%d %H:%M:%S") if date_match else datetime.now()
+            date_match = self._search_field("date_time", message, fields)
+            if date_match is None and category != "UNCATEGORIZED":
+                # Without its own timestamp a message has no stable month and
+                # could not be recognised when the same backup is ingested again
+                self.quarantine(message, "undated")
+                return None
+            date_time = datetime.strptime(date_match.group(1), "%Y-%m-%d %H:%M:%S") if date_match else None
+            
+            # Extract balance after the transaction and fee charged
+            balance_match = self._search_field("balance", message, fields)
+            balance = float(balance_match.group(1).replace(",", "")) if balance_match else None
+            
+            fee_match = self._search_field("fee", message, fields)
+            fee = float(fee_match.group(1).replace(",", "")) if fee_match else None
             
             # Extract transaction ID
-            txn_id_match = re.search(r"(?:Transaction Id:|TxId:)\s*(\d+)", message)
+            txn_id_match = self._search_field("transaction_id", message, fields)
             txn_id = txn_id_match.group(1) if txn_id_match else None
             
             # Extract sender/receiver based on category
@@ -102,7 +312,7 @@ class TransactionProcessor:
                 receiver = "Cash Power"
             elif category == "BUNDLES":
                 receiver = "Airtime_Balance"
-            elif category == "AIRTIME_PAYMENTS"| "BUNDLES":
+            elif category == "AIRTIME_PAYMENTS":
                 receiver = "Airtime_Balance"
                 
             return TransactionData(
@@ -112,52 +322,473 @@ class TransactionProcessor:
                 sender=sender,
                 receiver=receiver,
                 transaction_id=txn_id,
-                raw_message=message
+                raw_message=message,
+                balance=balance,
+                fee=fee
             )
         except Exception as e:
-            logging.error(f"Error processing message: {e}\nMessage: {message[:100]}...")
+            self.quarantine(message, "extraction_error", error=f"{type(e).__name__}: {e}")
             return None
+
+    def quarantine(self, message: str, reason: str, error: Optional[str] = None):
+        """
+        Record a message for the dead-letter file, flushing in batches.
+
+        Repeats of a message within a run share one entry whose ``count``
+        records how often it occurred.
+        """
+        entry = self.dead_letters.get(message)
+        self.dead_letters[message] = {
+            "reason": reason,
+            "error": error,
+            "pattern_version": self.pattern_version,
+            "quarantined_at": datetime.now().isoformat(),
+            "count": entry["count"] + 1 if entry else 1,
+            "raw_message": message
+        }
+        self.dead_letter_count += 1
+        self.unflushed_dead_letters += 1
+        if self.unflushed_dead_letters >= self.dead_letter_batch_size:
+            self.flush_dead_letters()
+
+    def flush_dead_letters(self):
+        """
+        Rewrite the NDJSON dead-letter file with this run's entries.
+
+        Entries from earlier runs are kept unless their message was
+        reprocessed in this run, in which case this run's outcome replaces
+        them. The file is written to ``dead_letter_path`` via a temporary
+        file, so readers never see a partial write.
+        """
+        kept = [
+            entry for entry in self.load_dead_letters()
+            if entry["raw_message"] not in self.reprocessed
+            and entry["raw_message"] not in self.dead_letters
+        ]
+        tmp_filename = f"{self.dead_letter_path}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in kept + list(self.dead_letters.values()))
+        os.replace(tmp_filename, self.dead_letter_path)
+        self.unflushed_dead_letters = 0
+
+    def load_dead_letters(self) -> List[Dict]:
+        """
+        Read the entries of the dead-letter file, collapsing duplicate lines
+        for the same message and pattern version.
+        """
+        filename = os.path.join(self.output_dir, DEAD_LETTER_FILENAME)
+        if not os.path.exists(filename):
+            return []
+        entries = {}
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry.setdefault("count", 1)
+                key = (entry["raw_message"], entry["pattern_version"])
+                if key not in entries or entries[key]["count"] < entry["count"]:
+                    entries[key] = entry
+        return list(entries.values())
+
+    def reset_dead_letters(self):
+        """Start a new quarantine run; the dead-letter file is left as is."""
+        self.dead_letters = {}
+        self.reprocessed = set()
+        self.dead_letter_count = 0
+        self.unflushed_dead_letters = 0
+
+    def extract_all(self, messages: List[str]) -> List[TransactionData]:
+        """
+        Extract every message, quarantining failures and uncategorized
+        messages instead of returning them. Each call is a new quarantine
+        run: dead letters of these messages from earlier runs are replaced.
+        """
+        self.reset_dead_letters()
+        self.reprocessed = set(messages)
+        transactions = []
+        for message in messages:
+            trans = self.extract_transaction_details(message)
+            if trans is None:
+                continue
+            if trans.category == "UNCATEGORIZED":
+                self.quarantine(message, "uncategorized")
+                continue
+            transactions.append(trans)
+        self.flush_dead_letters()
+        return transactions
             
     def save_to_file(self, transactions: List[TransactionData]):
-        """Save transactions to respective category files."""
+        """
+        Save transactions to per-month, per-category shard files.
+
+        Shards live at ``<output_dir>/<YYYY-MM>/<category>.json`` and are listed
+        in the manifest. Only the months present in ``transactions`` are
+        rewritten; shards for every other month are left untouched.
+        """
         try:
-            categorized = {}
+            partitioned = {}
             for trans in transactions:
-                categorized.setdefault(trans.category, []).append(trans)
+                month = trans.date_time.strftime("%Y-%m")
+                partitioned.setdefault(month, {}).setdefault(trans.category, []).append(trans)
+                
+            manifest = self.load_manifest()
+            
+            # Save each month/category partition to a separate JSON file
+            for month, categorized in partitioned.items():
+                month_dir = os.path.join(self.output_dir, month)
+                os.makedirs(month_dir, exist_ok=True)
+                
+                # Drop shards left over from a previous run of this month
+                for category, entry in manifest.get(month, {}).items():
+                    if category not in categorized:
+                        stale = os.path.join(self.output_dir, entry["file"])
+                        if os.path.exists(stale):
+                            os.remove(stale)
+                manifest[month] = {}
                 
-            # Save each category to a separate JSON file
-            for category, trans_list in categorized.items():
-                filename = os.path.join(self.output_dir, f"{category.lower()}.json")
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump([
-                        {
-                            "datetime": t.date_time.isoformat(),
-                            "amount": t.amount,
-                            "sender": t.sender,
-                            "receiver": t.receiver,
-                            "transaction_id": t.transaction_id,
-                            "raw_message": t.raw_message
-                        } for t in trans_list
-                    ], f, indent=2)
-                logging.info(f"Saved {len(trans_list)} transactions to {filename}")
+                for category, trans_list in categorized.items():
+                    shard = f"{month}/{category.lower()}.json"
+                    filename = os.path.join(self.output_dir, shard)
+                    with open(filename, 'w', encoding='utf-8') as f:
+                        json.dump([
+                            {
+                                "datetime": t.date_time.isoformat(),
+                                "amount": t.amount,
+                                "sender": t.sender,
+                                "receiver": t.receiver,
+                                "transaction_id": t.transaction_id,
+                                "balance": t.balance,
+                                "fee": t.fee,
+                                "raw_message": t.raw_message
+                            } for t in trans_list
+                        ], f, indent=2)
+                    manifest[month][category] = {"file": shard, "count": len(trans_list)}
+                    logging.info(f"Saved {len(trans_list)} transactions to {filename}")
+                    
+            self.save_manifest(manifest)
         except Exception as e:
             logging.error(f"Error saving to file: {e}")
             raise
+
+    def load_manifest(self) -> Dict:
+        """Load the shard manifest, mapping month -> category -> shard entry."""
+        filename = os.path.join(self.output_dir, MANIFEST_FILENAME)
+        if not os.path.exists(filename):
+            return {}
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_transactions(self) -> List[TransactionData]:
+        """Load every stored transaction from the shard files."""
+        return [
+            record_to_transaction(record["category"], record) for record in self.load_from_file()
+        ]
+
+    def save_manifest(self, manifest: Dict):
+        """Atomically write the shard manifest."""
+        filename = os.path.join(self.output_dir, MANIFEST_FILENAME)
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(manifest.items())), f, indent=2)
+        os.replace(tmp_filename, filename)
+
+    def load_from_file(self, start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None,
+                       category: Optional[str] = None) -> List[Dict]:
+        """
+        Load saved transactions, opening only the shards whose month overlaps
+        ``start_date``..``end_date`` (and whose category matches, if given).
+        """
+        first_month = start_date.strftime("%Y-%m") if start_date else None
+        last_month = end_date.strftime("%Y-%m") if end_date else None
+        
+        records = []
+        for month, categories in sorted(self.load_manifest().items()):
+            if (first_month and month < first_month) or (last_month and month > last_month):
+                continue
+            for shard_category, entry in categories.items():
+                if category and shard_category != category:
+                    continue
+                with open(os.path.join(self.output_dir, entry["file"]), 'r', encoding='utf-8') as f:
+                    shard = json.load(f)
+                for record in shard:
+                    date_time = datetime.fromisoformat(record["datetime"])
+                    if (start_date and date_time < start_date) or (end_date and date_time > end_date):
+                        continue
+                    records.append({"category": shard_category, **record})
+        return records
+
+    def build_amount_sketches(self, transactions: List[TransactionData]) -> Dict[str, Dict[str, AmountSketch]]:
+        """
+        Build per-category, per-month and per category/month amount sketches
+        for distribution queries. Category/month keys are ``CATEGORY|YYYY-MM``.
+        """
+        sketches = {'by_category': {}, 'by_month': {}, 'by_category_month': {}}
+        for trans in transactions:
+            month = trans.date_time.strftime("%Y-%m")
+            sketches['by_category'].setdefault(trans.category, AmountSketch()).add(trans.amount)
+            sketches['by_month'].setdefault(month, AmountSketch()).add(trans.amount)
+            sketches['by_category_month'].setdefault(
+                f"{trans.category}|{month}", AmountSketch()
+            ).add(trans.amount)
+        return sketches
+
+    def save_sketches(self, sketches: Dict[str, Dict[str, AmountSketch]]):
+        """Persist amount sketches alongside the category files."""
+        try:
+            filename = os.path.join(self.output_dir, SKETCH_FILENAME)
+            save_sketch_sets(sketches, filename)
+            logging.info(f"Saved amount sketches to {filename}")
+        except Exception as e:
+            logging.error(f"Error saving amount sketches: {e}")
+            raise
+
+    def save_balance_index(self, index: BalanceIndex):
+        """Persist the time-sorted balance index alongside the category files."""
+        try:
+            filename = os.path.join(self.output_dir, BALANCE_INDEX_FILENAME)
+            index.save(filename)
+            logging.info(f"Saved {len(index)} balance points to {filename}")
+        except Exception as e:
+            logging.error(f"Error saving balance index: {e}")
+            raise
+
+    def save_snapshot(self, transactions: List[TransactionData]):
+        """Write the columnar snapshot the API can serve from without a database."""
+        try:
+            filename = os.path.join(self.output_dir, SNAPSHOT_FILENAME)
+            write_snapshot(transactions, filename)
+            logging.info(f"Saved snapshot of {len(transactions)} transactions to {filename}")
+        except Exception as e:
+            logging.error(f"Error saving snapshot: {e}")
+            raise
+
+    def update_snapshot(self, transactions: List[TransactionData], replace_months=()):
+        """
+        Merge transactions into the snapshot without re-reading the shards.
+
+        Falls back to rebuilding it from every shard when the snapshot is
+        missing rows the manifest lists (e.g. after an interrupted ingest) or
+        was written by an older version.
+        """
+        try:
+            filename = os.path.join(self.output_dir, SNAPSHOT_FILENAME)
+            try:
+                count = update_snapshot(transactions, filename, replace_months)
+            except ValueError as e:
+                logging.warning(f"Rebuilding snapshot: {e}")
+                count = None
             
+            stored = sum(
+                entry["count"] for categories in self.load_manifest().values()
+                for entry in categories.values()
+            )
+            if count != stored:
+                logging.warning(f"Snapshot holds {count} rows but the shards {stored}; rebuilding it")
+                self.save_snapshot(self.load_transactions())
+            else:
+                logging.info(f"Merged {len(transactions)} transactions into snapshot {filename}")
+        except Exception as e:
+            logging.error(f"Error updating snapshot: {e}")
+            raise
+
+    def replace_months(self, transactions: List[TransactionData], months):
+        """
+        Replace ``months`` in the amount sketches, the balance index and the
+        snapshot with ``transactions``, keeping every other stored month.
+
+        Sketches are kept per category and month, so per-category sketches
+        are re-merged from them without reading any shard. Outputs missing
+        (or predating per category/month sketches) are rebuilt from every
+        shard instead.
+        """
+        other_months = set(self.load_manifest()) - set(months)
+        sketches = load_sketch_sets(os.path.join(self.output_dir, SKETCH_FILENAME))
+        index = BalanceIndex.load(os.path.join(self.output_dir, BALANCE_INDEX_FILENAME))
+        
+        if other_months and ('by_category_month' not in sketches or index is None):
+            stored = self.load_transactions()
+            self.save_sketches(self.build_amount_sketches(stored))
+            self.save_balance_index(BalanceIndex.from_transactions(stored))
+            self.save_snapshot(stored)
+            return
+        
+        fresh = self.build_amount_sketches(transactions)
+        by_month = {
+            month: sketch for month, sketch in sketches.get('by_month', {}).items()
+            if month in other_months
+        }
+        by_category_month = {
+            key: sketch for key, sketch in sketches.get('by_category_month', {}).items()
+            if key.split("|")[1] in other_months
+        }
+        by_month.update(fresh['by_month'])
+        by_category_month.update(fresh['by_category_month'])
+        by_category = {}
+        for key, sketch in by_category_month.items():
+            category = key.split("|")[0]
+            if category in by_category:
+                by_category[category].merge(sketch)
+            else:
+                by_category[category] = AmountSketch.from_dict(sketch.to_dict())
+        self.save_sketches({
+            'by_category': by_category,
+            'by_month': by_month,
+            'by_category_month': by_category_month
+        })
+        
+        kept = [
+            (timestamp, balance) for timestamp, balance in zip(index.timestamps, index.balances)
+            if timestamp.strftime("%Y-%m") in other_months
+        ] if index else []
+        self.save_balance_index(BalanceIndex(
+            [point[0] for point in kept], [point[1] for point in kept]
+        ).merge(BalanceIndex.from_transactions(transactions)))
+        
+        self.update_snapshot(transactions, months)
+
+    def remove_legacy_files(self):
+        """
+        Remove the flat ``<category>.json`` files written before outputs were
+        sharded by month; a full processing run supersedes them.
+        """
+        for category in list(self.categories) + ["UNCATEGORIZED"]:
+            filename = os.path.join(self.output_dir, f"{category.lower()}.json")
+            if os.path.exists(filename):
+                os.remove(filename)
+                logging.info(f"Removed legacy output file {filename}")
+
     def process_file(self, xml_file: str) -> List[TransactionData]:
         """Main processing function."""
         try:
             messages = self.parse_xml(xml_file)
-            transactions = [self.extract_transaction_details(msg) for msg in messages]
-            transactions = [t for t in transactions if t]  # Filter out None values
             
-            self.save_to_file(transactions)
+            with self.lock:
+                transactions = self.extract_all(messages)
+                
+                # Only the months in this run are rewritten; shards and derived
+                # outputs for every other month are kept
+                self.save_to_file(transactions)
+                self.replace_months(transactions, {t.date_time.strftime("%Y-%m") for t in transactions})
+                self.remove_legacy_files()
+            
             logging.info(f"Processing completed. Total transactions: {len(transactions)}")
+            logging.info(f"Quarantined {self.dead_letter_count} messages to {DEAD_LETTER_FILENAME}")
+            logging.info(f"Template cache stats: {self.cache_stats()}")
             return transactions
         except Exception as e:
             logging.error(f"Processing failed: {e}")
             raise
 
+    def ingest_messages(self, messages: List[str]) -> List[TransactionData]:
+        """
+        Extract messages and merge them into the existing outputs.
+
+        Returns the newly added transactions; messages already stored are
+        skipped.
+        """
+        with self.lock:
+            transactions = self.merge_outputs(self.extract_all(messages))
+        logging.info(f"Ingested {len(transactions)} new transactions from {len(messages)} messages")
+        logging.info(f"Template cache stats: {self.cache_stats()}")
+        return transactions
+
+    def merge_outputs(self, transactions: List[TransactionData]) -> List[TransactionData]:
+        """
+        Merge transactions into the shard files, the amount sketches, the
+        balance index and the snapshot. Transactions already stored are
+        skipped, so merging the same batch twice is safe. Returns the newly
+        added transactions.
+        """
+        with self.lock:
+            added = self.merge_into_files(transactions)
+            
+            if added:
+                sketch_filename = os.path.join(self.output_dir, SKETCH_FILENAME)
+                self.save_sketches(merge_sketch_sets(
+                    load_sketch_sets(sketch_filename), self.build_amount_sketches(added)
+                ))
+                
+                index = BalanceIndex.load(os.path.join(self.output_dir, BALANCE_INDEX_FILENAME))
+                ingested = BalanceIndex.from_transactions(added)
+                self.save_balance_index(index.merge(ingested) if index else ingested)
+                
+                self.update_snapshot(added)
+            return added
+
+    def replay_dead_letters(self, on_resolved=None) -> List[TransactionData]:
+        """
+        Reprocess only quarantined messages, typically after fixing a pattern.
+
+        Messages that now resolve are merged into the existing outputs as by
+        ``merge_outputs``; the rest are quarantined again. ``on_resolved``,
+        if given, is called with ``(resolved, added)`` before the quarantine
+        is rewritten, e.g. to store the transactions in the database.
+
+        The still-failing messages are written to a temporary file that only
+        replaces the dead-letter file once the merge and ``on_resolved`` have
+        succeeded. On failure the quarantine is left untouched, and because
+        merging is idempotent the replay can simply be retried.
+
+        Returns every resolved transaction, including ones a failed earlier
+        replay had already merged into the files.
+        """
+        filename = os.path.join(self.output_dir, DEAD_LETTER_FILENAME)
+        try:
+            with self.lock:
+                entries = self.load_dead_letters()
+                
+                self.dead_letter_path = f"{filename}.replay"
+                transactions = self.extract_all([
+                    entry["raw_message"] for entry in entries for _ in range(entry["count"])
+                ])
+                added = self.merge_outputs(transactions)
+                if on_resolved is not None:
+                    on_resolved(transactions, added)
+                os.replace(self.dead_letter_path, filename)
+            
+            logging.info(
+                f"Replay completed. Resolved {len(transactions)} of {len(entries)} "
+                f"quarantined messages with pattern version {self.pattern_version}"
+            )
+            logging.info(f"Template cache stats: {self.cache_stats()}")
+            return transactions
+        except Exception as e:
+            if os.path.exists(self.dead_letter_path) and self.dead_letter_path != filename:
+                os.remove(self.dead_letter_path)
+            logging.error(f"Replay failed: {e}")
+            raise
+        finally:
+            self.dead_letter_path = filename
+
+    def merge_into_files(self, transactions: List[TransactionData]) -> List[TransactionData]:
+        """
+        Add transactions to the shard files, rewriting only the months they
+        touch. Transactions are matched on ``transaction_keys``, so a message
+        without a TxId that occurs three times in the batch but only once in
+        the files is added twice. Returns the transactions that were not already stored.
+        """
+        months = {t.date_time.strftime("%Y-%m") for t in transactions}
+        manifest = self.load_manifest()
+        
+        stored = []
+        for month in months:
+            for category, entry in manifest.get(month, {}).items():
+                with open(os.path.join(self.output_dir, entry["file"]), 'r', encoding='utf-8') as f:
+                    stored.extend(record_to_transaction(category, record) for record in json.load(f))
+        
+        seen = set(transaction_keys(stored))
+        added = []
+        for trans, key in zip(transactions, transaction_keys(transactions)):
+            if key not in seen:
+                seen.add(key)
+                added.append(trans)
+        
+        if added:
+            self.save_to_file(sorted(stored + added, key=lambda t: t.date_time))
+        return added
+
     def get_category_summary(self, transactions: List[TransactionData]) -> Dict:
         """Generate summary statistics by category."""
         summary = {}
@@ -184,4 +815,21 @@ class TransactionProcessor:
             if stats['max_amount'] == float('-inf'):
                 stats['max_amount'] = 0
                 
-        return summary
\ No newline at end of file
+        return summary
+
+
+_processors = {}
+_processors_guard = threading.Lock()
+
+
+def shared_processor(output_dir: str) -> TransactionProcessor:
+    """
+    Return the process-wide processor for ``output_dir``, so its template
+    cache stays warm across requests. Its run state is shared as well, so
+    use it while holding ``processor.lock``.
+    """
+    key = os.path.abspath(output_dir)
+    with _processors_guard:
+        if key not in _processors:
+            _processors[key] = TransactionProcessor(key)
+        return _processors[key]
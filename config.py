@@ -22,16 +22,25 @@ class Config:
         'pool_pre_ping': True
     }
     
+    # Monthly range partitions created with the transaction table
+    TRANSACTION_PARTITION_START = os.environ.get('TRANSACTION_PARTITION_START', '2024-01')
+    TRANSACTION_PARTITION_MONTHS = int(os.environ.get('TRANSACTION_PARTITION_MONTHS', 36))
+    
     # Application Directories
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     OUTPUT_FOLDER = os.path.join(BASE_DIR, 'output')
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     
+    # Serve transactions and summaries from the processor's memory-mapped
+    # snapshot in OUTPUT_FOLDER instead of the database
+    SERVE_FROM_SNAPSHOT = os.environ.get('SERVE_FROM_SNAPSHOT', 'False') == 'True'
+    
     # File Upload Configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size
     
     # Logging Configuration
     LOGGING_LEVEL = os.environ.get('LOGGING_LEVEL', 'INFO')
+    LOG_FOLDER = os.environ.get('LOG_FOLDER', os.path.join(BASE_DIR, 'logs'))
     
     # CORS Configuration
     CORS_HEADERS = 'Content-Type'
@@ -68,6 +77,8 @@ class TestingConfig(Config):
     """Configuration for Testing Environment"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # SQLite's in-memory pool does not accept the MySQL pool settings
+    SQLALCHEMY_ENGINE_OPTIONS = {}
 
 def get_config(config_name='development'):
     """
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 from app import create_app, db
+from app.models import Transaction
 
 # Load environment variables
 load_dotenv()
@@ -11,8 +13,14 @@ app = create_app()
 
 # Create application context
 with app.app_context():
-    # Create database tables if they don't exist
-    db.create_all()
+    # Create database tables if they don't exist (not needed when the API
+    # serves from the processor's snapshot)
+    if not app.config['SERVE_FROM_SNAPSHOT']:
+        db.create_all()
+
+        # Make sure the current month has its own partition
+        now = datetime.now()
+        Transaction.ensure_month_partitions([(now.year, now.month)])
 
 # Run the application
 if __name__ == '__main__':
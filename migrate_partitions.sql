@@ -0,0 +1,65 @@
+-- migrate_partitions.sql
+-- Brings a transaction table created before monthly partitioning up to the
+-- layout in schema.sql. Back up the table and run once; new months are added
+-- afterwards by Transaction.ensure_month_partitions.
+
+USE transactions_db;
+
+-- Balance and fee columns
+ALTER TABLE transaction
+    ADD COLUMN balance DECIMAL(15, 2) AFTER receiver,
+    ADD COLUMN fee DECIMAL(15, 2) AFTER balance;
+
+-- date_time is the partitioning column, so it must be in every unique key.
+-- The old unique index on transaction_id is named `transaction_id` when the
+-- table came from schema.sql and `ix_transaction_transaction_id` when it came
+-- from db.create_all(); check SHOW INDEX FROM transaction and adjust the
+-- DROP INDEX line to match.
+ALTER TABLE transaction
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, date_time),
+    DROP INDEX transaction_id,
+    ADD INDEX idx_transaction_id (transaction_id),
+    ADD UNIQUE KEY uq_transaction_id_date_time (transaction_id, date_time);
+
+-- One partition per month; extend the list if data predates 2024-01
+ALTER TABLE transaction
+PARTITION BY RANGE (TO_DAYS(date_time)) (
+    PARTITION p202401 VALUES LESS THAN (TO_DAYS('2024-02-01')),
+    PARTITION p202402 VALUES LESS THAN (TO_DAYS('2024-03-01')),
+    PARTITION p202403 VALUES LESS THAN (TO_DAYS('2024-04-01')),
+    PARTITION p202404 VALUES LESS THAN (TO_DAYS('2024-05-01')),
+    PARTITION p202405 VALUES LESS THAN (TO_DAYS('2024-06-01')),
+    PARTITION p202406 VALUES LESS THAN (TO_DAYS('2024-07-01')),
+    PARTITION p202407 VALUES LESS THAN (TO_DAYS('2024-08-01')),
+    PARTITION p202408 VALUES LESS THAN (TO_DAYS('2024-09-01')),
+    PARTITION p202409 VALUES LESS THAN (TO_DAYS('2024-10-01')),
+    PARTITION p202410 VALUES LESS THAN (TO_DAYS('2024-11-01')),
+    PARTITION p202411 VALUES LESS THAN (TO_DAYS('2024-12-01')),
+    PARTITION p202412 VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01')),
+    PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01')),
+    PARTITION p202503 VALUES LESS THAN (TO_DAYS('2025-04-01')),
+    PARTITION p202504 VALUES LESS THAN (TO_DAYS('2025-05-01')),
+    PARTITION p202505 VALUES LESS THAN (TO_DAYS('2025-06-01')),
+    PARTITION p202506 VALUES LESS THAN (TO_DAYS('2025-07-01')),
+    PARTITION p202507 VALUES LESS THAN (TO_DAYS('2025-08-01')),
+    PARTITION p202508 VALUES LESS THAN (TO_DAYS('2025-09-01')),
+    PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01')),
+    PARTITION p202510 VALUES LESS THAN (TO_DAYS('2025-11-01')),
+    PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+    PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+    PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+    PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+    PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+    PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+    PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+    PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+    PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+    PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+    PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+    PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+    PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
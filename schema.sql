@@ -1,21 +1,67 @@
 -- schema.sql
+-- Existing installs created before monthly partitioning: see migrate_partitions.sql
 CREATE DATABASE IF NOT EXISTS transactions_db CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
 USE transactions_db;
 
 CREATE TABLE IF NOT EXISTS transaction (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     category VARCHAR(50) NOT NULL,
     date_time DATETIME NOT NULL,
     amount DECIMAL(15, 2) NOT NULL,
     sender VARCHAR(100),
     receiver VARCHAR(100),
-    transaction_id VARCHAR(50) UNIQUE,
+    balance DECIMAL(15, 2),
+    fee DECIMAL(15, 2),
+    transaction_id VARCHAR(50),
     raw_message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- date_time is the partitioning column, so it must be in every unique key
+    PRIMARY KEY (id, date_time),
+    UNIQUE KEY uq_transaction_id_date_time (transaction_id, date_time),
     INDEX idx_category (category),
     INDEX idx_date_time (date_time),
     INDEX idx_amount (amount),
     INDEX idx_sender (sender),
     INDEX idx_receiver (receiver)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
\ No newline at end of file
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+-- One partition per month; date-bounded queries only scan the matching months
+PARTITION BY RANGE (TO_DAYS(date_time)) (
+    PARTITION p202401 VALUES LESS THAN (TO_DAYS('2024-02-01')),
+    PARTITION p202402 VALUES LESS THAN (TO_DAYS('2024-03-01')),
+    PARTITION p202403 VALUES LESS THAN (TO_DAYS('2024-04-01')),
+    PARTITION p202404 VALUES LESS THAN (TO_DAYS('2024-05-01')),
+    PARTITION p202405 VALUES LESS THAN (TO_DAYS('2024-06-01')),
+    PARTITION p202406 VALUES LESS THAN (TO_DAYS('2024-07-01')),
+    PARTITION p202407 VALUES LESS THAN (TO_DAYS('2024-08-01')),
+    PARTITION p202408 VALUES LESS THAN (TO_DAYS('2024-09-01')),
+    PARTITION p202409 VALUES LESS THAN (TO_DAYS('2024-10-01')),
+    PARTITION p202410 VALUES LESS THAN (TO_DAYS('2024-11-01')),
+    PARTITION p202411 VALUES LESS THAN (TO_DAYS('2024-12-01')),
+    PARTITION p202412 VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01')),
+    PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01')),
+    PARTITION p202503 VALUES LESS THAN (TO_DAYS('2025-04-01')),
+    PARTITION p202504 VALUES LESS THAN (TO_DAYS('2025-05-01')),
+    PARTITION p202505 VALUES LESS THAN (TO_DAYS('2025-06-01')),
+    PARTITION p202506 VALUES LESS THAN (TO_DAYS('2025-07-01')),
+    PARTITION p202507 VALUES LESS THAN (TO_DAYS('2025-08-01')),
+    PARTITION p202508 VALUES LESS THAN (TO_DAYS('2025-09-01')),
+    PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01')),
+    PARTITION p202510 VALUES LESS THAN (TO_DAYS('2025-11-01')),
+    PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+    PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+    PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+    PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+    PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+    PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+    PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+    PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+    PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+    PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+    PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+    PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+    PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
\ No newline at end of file
@@ -0,0 +1,120 @@
+#test_amount_sketch.py
+import random
+
+import pytest
+
+from app.amount_sketch import (
+    AmountSketch, load_sketch_sets, merge_sketch_sets, open_sketch_sets, save_sketch_sets
+)
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.fixture
+def amounts():
+    rng = random.Random(42)
+    return [round(rng.lognormvariate(8, 1.5)) + 1 for _ in range(5000)]
+
+
+def test_quantiles_within_relative_accuracy(amounts):
+    sketch = AmountSketch(relative_accuracy=0.01)
+    for amount in amounts:
+        sketch.add(amount)
+
+    for q in (0, 0.1, 0.5, 0.9, 0.99, 1):
+        expected = exact_quantile(amounts, q)
+        assert abs(sketch.quantile(q) - expected) <= 0.01 * expected
+
+
+def test_merge_matches_single_sketch(amounts):
+    single = AmountSketch()
+    for amount in amounts:
+        single.add(amount)
+
+    left, right = AmountSketch(), AmountSketch()
+    for i, amount in enumerate(amounts):
+        (left if i % 3 else right).add(amount)
+    merged = left.merge(right)
+
+    assert merged.to_dict() == single.to_dict()
+    for q in (0.25, 0.5, 0.95):
+        assert merged.quantile(q) == single.quantile(q)
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        AmountSketch(0.01).merge(AmountSketch(0.02))
+
+
+def test_quantile_out_of_range():
+    sketch = AmountSketch()
+    sketch.add(100)
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
+    with pytest.raises(ValueError):
+        sketch.quantile(-0.1)
+
+
+def test_empty_sketch():
+    sketch = AmountSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.histogram() == []
+    assert sketch.summary()['min_amount'] == 0
+    assert AmountSketch.from_dict(sketch.to_dict()).count == 0
+
+
+def test_zero_and_negative_values():
+    sketch = AmountSketch()
+    for value in (-50, 0, 0, 20):
+        sketch.add(value)
+    assert sketch.quantile(0) == pytest.approx(-50, rel=0.01)
+    assert sketch.quantile(0.5) == 0
+    assert sketch.quantile(1) == pytest.approx(20, rel=0.01)
+
+
+def test_histogram_counts_every_value(amounts):
+    sketch = AmountSketch()
+    for amount in amounts:
+        sketch.add(amount)
+
+    buckets = sketch.histogram(bucket_count=8)
+    assert len(buckets) == 8
+    assert sum(bucket['count'] for bucket in buckets) == len(amounts)
+    assert buckets[0]['lower'] == sketch.min
+    assert buckets[-1]['upper'] == pytest.approx(sketch.max)
+
+
+def test_sketch_sets_round_trip(tmp_path, amounts):
+    first = {'by_category': {'DEPOSITS': AmountSketch()}}
+    second = {'by_category': {'DEPOSITS': AmountSketch(), 'BUNDLES': AmountSketch()}}
+    for amount in amounts[:100]:
+        first['by_category']['DEPOSITS'].add(amount)
+    for amount in amounts[100:200]:
+        second['by_category']['DEPOSITS'].add(amount)
+        second['by_category']['BUNDLES'].add(amount)
+
+    filename = str(tmp_path / 'sketches.json')
+    save_sketch_sets(merge_sketch_sets(first, second), filename)
+    loaded = load_sketch_sets(filename)
+
+    assert loaded['by_category']['DEPOSITS'].count == 200
+    assert loaded['by_category']['BUNDLES'].count == 100
+    assert load_sketch_sets(str(tmp_path / 'missing.json')) == {}
+
+
+def test_open_sketch_sets_reloads_replaced_file(tmp_path):
+    filename = str(tmp_path / 'sketches.json')
+    assert open_sketch_sets(filename) == {}
+
+    sketch = AmountSketch()
+    sketch.add(100)
+    save_sketch_sets({'by_category': {'DEPOSITS': sketch}}, filename)
+    shared = open_sketch_sets(filename)
+    assert open_sketch_sets(filename) is shared
+
+    sketch.add(200)
+    save_sketch_sets({'by_category': {'DEPOSITS': sketch}}, filename)
+    assert open_sketch_sets(filename)['by_category']['DEPOSITS'].count == 2
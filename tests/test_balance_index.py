@@ -0,0 +1,88 @@
+#test_balance_index.py
+from datetime import datetime
+
+import pytest
+
+from app.balance_index import BalanceIndex, open_balance_index
+from app.transaction_processor import TransactionData
+
+
+@pytest.fixture
+def index():
+    return BalanceIndex(
+        [datetime(2024, 5, 1, 9), datetime(2024, 5, 2, 9), datetime(2024, 5, 2, 9),
+         datetime(2024, 5, 4, 9)],
+        [1000.0, 800.0, 750.0, 900.0]
+    )
+
+
+def test_as_of_before_first_point(index):
+    assert index.as_of(datetime(2024, 4, 30)) is None
+
+
+def test_as_of_exact_and_between_points(index):
+    assert index.as_of(datetime(2024, 5, 1, 9))['balance'] == 1000.0
+    assert index.as_of(datetime(2024, 5, 3))['balance'] == 750.0
+    assert index.as_of(datetime(2030, 1, 1))['balance'] == 900.0
+
+
+def test_as_of_tie_returns_last_point(index):
+    assert index.as_of(datetime(2024, 5, 2, 9)) == {
+        'date_time': '2024-05-02T09:00:00',
+        'balance': 750.0
+    }
+
+
+def test_between_bounds_are_inclusive(index):
+    points = index.between(datetime(2024, 5, 2, 9), datetime(2024, 5, 4, 9))
+    assert [p['balance'] for p in points] == [800.0, 750.0, 900.0]
+
+
+def test_between_open_bounds(index):
+    assert len(index.between()) == 4
+    assert [p['balance'] for p in index.between(start=datetime(2024, 5, 3))] == [900.0]
+    assert [p['balance'] for p in index.between(end=datetime(2024, 5, 1, 9))] == [1000.0]
+    assert index.between(datetime(2024, 6, 1), datetime(2024, 7, 1)) == []
+
+
+def test_empty_index():
+    empty = BalanceIndex()
+    assert len(empty) == 0
+    assert empty.as_of(datetime(2024, 5, 1)) is None
+    assert empty.between() == []
+
+
+def test_from_transactions_skips_missing_balances():
+    transactions = [
+        TransactionData('DEPOSITS', datetime(2024, 5, 3), 500.0, None, None, None, 'b', balance=1500.0),
+        TransactionData('DEPOSITS', datetime(2024, 5, 1), 500.0, None, None, None, 'a', balance=1000.0),
+        TransactionData('BANK_DEPOSITS', datetime(2024, 5, 2), 500.0, None, None, None, 'c')
+    ]
+    index = BalanceIndex.from_transactions(transactions)
+    assert index.timestamps == [datetime(2024, 5, 1), datetime(2024, 5, 3)]
+    assert index.balances == [1000.0, 1500.0]
+
+
+def test_merge_keeps_time_order(index):
+    other = BalanceIndex([datetime(2024, 4, 30), datetime(2024, 5, 3)], [100.0, 200.0])
+    merged = index.merge(other)
+    assert merged.timestamps == sorted(index.timestamps + other.timestamps)
+    assert merged.balances == [100.0, 1000.0, 800.0, 750.0, 200.0, 900.0]
+    assert len(index) == 4
+
+
+def test_save_load_and_shared_reload(tmp_path, index):
+    filename = str(tmp_path / 'balance_index.json')
+    assert BalanceIndex.load(filename) is None
+    assert open_balance_index(filename) is None
+
+    index.save(filename)
+    loaded = BalanceIndex.load(filename)
+    assert loaded.timestamps == index.timestamps
+    assert loaded.balances == index.balances
+
+    shared = open_balance_index(filename)
+    assert open_balance_index(filename) is shared
+
+    BalanceIndex([datetime(2024, 6, 1)], [10.0]).save(filename)
+    assert open_balance_index(filename).balances == [10.0]
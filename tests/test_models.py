@@ -0,0 +1,34 @@
+#test_models.py
+from app.models import missing_month_partitions, month_partition, month_range
+
+
+def test_month_range_crosses_years():
+    assert month_range('2024-11', 4) == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+    assert month_range('2024-01', 0) == []
+
+
+def test_month_partition_bounds_next_month():
+    assert month_partition(2024, 12) == (
+        "PARTITION p202412 VALUES LESS THAN (TO_DAYS('2025-01-01'))"
+    )
+    assert month_partition(2025, 2) == (
+        "PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01'))"
+    )
+
+
+def test_missing_partitions_fill_gap_after_newest():
+    existing = ['p202410', 'p202411', 'p_future']
+    assert missing_month_partitions(existing, [(2025, 2)]) == [(2024, 12), (2025, 1), (2025, 2)]
+    assert missing_month_partitions(existing, [(2024, 12), (2024, 5)]) == [(2024, 12)]
+
+
+def test_missing_partitions_covered_months():
+    existing = ['p202410', 'p202411', 'p_future']
+    assert missing_month_partitions(existing, [(2024, 11), (2023, 1)]) == []
+    assert missing_month_partitions(existing, []) == []
+
+
+def test_missing_partitions_without_monthly_partitions():
+    assert missing_month_partitions(['p_future'], [(2024, 12), (2025, 2)]) == \
+        [(2024, 12), (2025, 1), (2025, 2)]
+    assert missing_month_partitions([None], [(2024, 3)]) == [(2024, 3)]
@@ -0,0 +1,81 @@
+#test_routes.py
+import os
+
+import pytest
+
+from app import create_app, db
+from app.models import Transaction
+from config import TestingConfig
+
+SAMPLE_XML = os.path.join(os.path.dirname(__file__), 'data', 'sms_sample.xml')
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Keep the rotating log out of the tracked logs/ directory
+    monkeypatch.setattr(TestingConfig, 'LOG_FOLDER', str(tmp_path / 'logs'))
+    app = create_app('testing')
+    app.config.update(
+        OUTPUT_FOLDER=str(tmp_path / 'output'),
+        UPLOAD_FOLDER=str(tmp_path)
+    )
+    with app.app_context():
+        db.create_all()
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+
+def ingest(client, xml):
+    with open(xml, 'rb') as f:
+        return client.post(
+            '/api/ingest', data={'file': (f, 'sample.xml')}, content_type='multipart/form-data'
+        )
+
+
+def test_ingest_is_idempotent(client):
+    first = ingest(client, SAMPLE_XML).get_json()
+    assert first['inserted'] == first['ingested'] == Transaction.query.count()
+    assert first['updated'] == 0
+
+    second = ingest(client, SAMPLE_XML).get_json()
+    assert (second['ingested'], second['inserted'], second['updated']) == (0, 0, 0)
+    assert second['template_cache']['hits'] > first['template_cache']['hits']
+
+
+def test_replay_stores_resolved_messages(client):
+    ingest(client, SAMPLE_XML)
+    stored = Transaction.query.count()
+
+    response = client.post('/api/dead-letters/replay')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['resolved'], body['inserted'], body['updated']) == (0, 0, 0)
+    assert body['still_quarantined'] > 0
+    assert Transaction.query.count() == stored
+
+
+def write_repeated(tmp_path, message, copies):
+    xml = tmp_path / 'repeated.xml'
+    xml.write_text('<smses>' + f'<sms body="{message}"/>' * copies + '</smses>', encoding='utf-8')
+    return str(xml)
+
+
+def test_repeated_messages_get_one_row_each(client, tmp_path):
+    message = (
+        "*165*S*10000 RWF transferred to Samuel Carter (250791666666) from 36521838 at "
+        "2024-05-11 20:34:47 . Fee was: 100 RWF. New balance: 28300 RWF."
+    )
+    for copies, inserted in ((2, 2), (3, 1), (3, 0)):
+        assert ingest(client, write_repeated(tmp_path, message, copies)).get_json()['inserted'] == inserted
+    assert Transaction.query.filter_by(raw_message=message).count() == 3
+
+
+def test_repeated_txid_is_one_transaction(client, tmp_path):
+    message = (
+        "*162*TxId:14324965479*S*Your payment of 2000 RWF to Bundles and Packs with token  "
+        "has been completed at 2024-06-11 06:26:11. Fee was 0 RWF. Your new balance: 350 RWF"
+    )
+    for copies, inserted in ((2, 1), (3, 0)):
+        assert ingest(client, write_repeated(tmp_path, message, copies)).get_json()['inserted'] == inserted
+    assert Transaction.query.filter_by(raw_message=message).count() == 1
@@ -0,0 +1,255 @@
+#test_snapshot.py
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import desc, or_
+
+from app import create_app, db
+from app.models import Transaction
+from app.snapshot import TransactionSnapshot, open_snapshot, update_snapshot, write_snapshot
+from app.transaction_processor import TransactionData
+from config import TestingConfig
+
+CATEGORIES = ['INCOMING_MONEY', 'PAYMENTS_TO_CODE_HOLDERS', 'AIRTIME_PAYMENTS', 'BUNDLES']
+
+
+def make_transactions(count=300):
+    rng = random.Random(7)
+    start = datetime(2024, 5, 1)
+    transactions = []
+    for i in range(count):
+        transactions.append(TransactionData(
+            category=rng.choice(CATEGORIES),
+            # Whole seconds only, as the snapshot stores epoch seconds
+            date_time=start + timedelta(seconds=rng.randrange(0, 200 * 24 * 3600)),
+            amount=float(rng.randrange(100, 50000, 50)),
+            sender=rng.choice([None, 'Jane Smith', 'Samuel Carter']),
+            receiver=rng.choice([None, 'Linda Green', 'Alex Doe']),
+            transaction_id=None if i % 5 == 0 else str(76662021700 + i),
+            raw_message=f"*165*S*{i} RWF transferred, message {i} é",
+            balance=None if i % 4 == 0 else float(rng.randrange(0, 100000)),
+            fee=None if i % 3 == 0 else float(rng.choice([0, 100, 250]))
+        ))
+    return transactions
+
+
+@pytest.fixture
+def transactions():
+    return make_transactions()
+
+
+@pytest.fixture
+def snapshot(tmp_path, transactions):
+    filename = str(tmp_path / 'transactions.snapshot')
+    write_snapshot(transactions, filename)
+    return TransactionSnapshot(filename)
+
+
+@pytest.fixture
+def app(transactions, tmp_path, monkeypatch):
+    # Keep the rotating log out of the tracked logs/ directory
+    monkeypatch.setattr(TestingConfig, 'LOG_FOLDER', str(tmp_path / 'logs'))
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        for trans in transactions:
+            db.session.add(Transaction(**{
+                field: getattr(trans, field) for field in (
+                    'category', 'date_time', 'amount', 'sender', 'receiver',
+                    'balance', 'fee', 'transaction_id', 'raw_message'
+                )
+            }))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def comparable(row):
+    return {key: value for key, value in row.items() if key not in ('id', 'created_at')}
+
+
+def test_round_trip(snapshot, transactions):
+    assert snapshot.count == len(transactions)
+    assert snapshot.categories == sorted(CATEGORIES)
+
+    expected = sorted((t.to_dict() for t in transactions), key=lambda row: row['date_time'])
+    rows = [snapshot.row(i) for i in range(snapshot.count)]
+    assert [row['date_time'] for row in rows] == [row['date_time'] for row in expected]
+    assert sorted(map(comparable, rows), key=lambda row: row['raw_message']) == \
+        sorted(map(comparable, expected), key=lambda row: row['raw_message'])
+
+
+def test_rows_have_no_stable_id(snapshot):
+    assert {snapshot.row(i)['id'] for i in range(snapshot.count)} == {None}
+
+
+def snapshot_rows(snapshot):
+    rows = [comparable(snapshot.row(i)) for i in range(snapshot.count)]
+    return [row['date_time'] for row in rows], sorted(rows, key=lambda row: row['raw_message'])
+
+
+@pytest.mark.parametrize('replace_months', [(), ('2024-06',), ('2024-05', '2024-08', '2030-01')])
+def test_update_matches_full_write(tmp_path, transactions, replace_months):
+    base, added = transactions[:200], transactions[200:]
+    # A new category and a timestamp tied with an existing row
+    added.append(TransactionData(
+        'WITHDRAWALS', base[0].date_time, 5000.0, None, 'Agent', None, 'withdrawn 5000 RWF'
+    ))
+
+    filename = str(tmp_path / 'updated.snapshot')
+    write_snapshot(base, filename)
+    count = update_snapshot(added, filename, replace_months)
+
+    expected = [
+        t for t in base if t.date_time.strftime('%Y-%m') not in replace_months
+    ] + added
+    reference = str(tmp_path / 'reference.snapshot')
+    write_snapshot(expected, reference)
+
+    assert count == len(expected)
+    updated = TransactionSnapshot(filename)
+    assert updated.categories == sorted(CATEGORIES + ['WITHDRAWALS'])
+    assert snapshot_rows(updated) == snapshot_rows(TransactionSnapshot(reference))
+    assert updated.category_summary() == TransactionSnapshot(reference).category_summary()
+
+
+def test_update_compacts_unreferenced_messages(tmp_path, transactions):
+    filename = str(tmp_path / 'transactions.snapshot')
+    write_snapshot(transactions, filename)
+    months = sorted({t.date_time.strftime('%Y-%m') for t in transactions})
+
+    # Replacing every month with itself leaves the old messages unreferenced
+    message_counts = []
+    for _ in range(12):
+        update_snapshot(transactions, filename, months)
+        message_counts.append(len(TransactionSnapshot(filename).sections['message_offsets']) - 1)
+    assert max(message_counts) <= 2 * 1024
+    assert min(message_counts) == len(transactions)
+
+    reference = str(tmp_path / 'reference.snapshot')
+    write_snapshot(transactions, reference)
+    assert snapshot_rows(TransactionSnapshot(filename)) == snapshot_rows(TransactionSnapshot(reference))
+
+
+def test_update_creates_missing_snapshot(tmp_path, transactions):
+    filename = str(tmp_path / 'transactions.snapshot')
+    assert update_snapshot(transactions, filename) == len(transactions)
+    assert TransactionSnapshot(filename).count == len(transactions)
+
+
+def test_empty_snapshot(tmp_path):
+    filename = str(tmp_path / 'empty.snapshot')
+    write_snapshot([], filename)
+    snapshot = TransactionSnapshot(filename)
+    assert snapshot.count == 0
+    assert snapshot.filter() == []
+    assert snapshot.category_summary() == []
+    assert snapshot.monthly_summary() == []
+
+
+def test_rejects_other_files(tmp_path):
+    filename = tmp_path / 'other.snapshot'
+    filename.write_bytes(b"not a snapshot" * 4)
+    with pytest.raises(ValueError):
+        TransactionSnapshot(str(filename))
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'category': 'BUNDLES'},
+    {'category': 'UNKNOWN'},
+    {'start_date': datetime(2024, 7, 1), 'end_date': datetime(2024, 8, 15, 12)},
+    {'start_date': datetime(2024, 9, 1), 'min_amount': 10000.0},
+    {'end_date': datetime(2024, 6, 1), 'max_amount': 5000.0},
+    {'category': 'INCOMING_MONEY', 'min_amount': 1000.0, 'max_amount': 20000.0},
+])
+def test_filter_matches_database(app, snapshot, filters):
+    query = Transaction.query
+    if 'category' in filters:
+        query = query.filter_by(category=filters['category'])
+    if 'start_date' in filters:
+        query = query.filter(Transaction.date_time >= filters['start_date'])
+    if 'end_date' in filters:
+        query = query.filter(Transaction.date_time <= filters['end_date'])
+    if 'min_amount' in filters:
+        query = query.filter(Transaction.amount >= filters['min_amount'])
+    if 'max_amount' in filters:
+        query = query.filter(Transaction.amount <= filters['max_amount'])
+    expected = [comparable(t.to_dict()) for t in query.order_by(desc(Transaction.date_time))]
+
+    rows = [comparable(snapshot.row(i)) for i in snapshot.filter(**filters)]
+    assert [row['date_time'] for row in rows] == [row['date_time'] for row in expected]
+    assert sorted(rows, key=lambda row: row['raw_message']) == \
+        sorted(expected, key=lambda row: row['raw_message'])
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    (None, None),
+    (datetime(2024, 6, 10), None),
+    (None, datetime(2024, 9, 30, 23, 59, 59)),
+    (datetime(2024, 7, 1), datetime(2024, 7, 31)),
+])
+def test_category_summary_matches_database(app, snapshot, start_date, end_date):
+    expected = {
+        row.category: (row.transaction_count, row.total_amount)
+        for row in Transaction.get_category_summary(start_date, end_date)
+    }
+    summary = {
+        category: (count, total)
+        for category, count, total in snapshot.category_summary(start_date, end_date)
+    }
+    assert summary.keys() == expected.keys()
+    for category, (count, total) in summary.items():
+        assert count == expected[category][0]
+        assert total == pytest.approx(expected[category][1])
+
+
+def test_monthly_summary(snapshot, transactions):
+    # Transaction.get_monthly_summary uses MySQL's YEAR()/MONTH(), so
+    # compare against the same grouping done in Python
+    start_date, end_date = datetime(2024, 6, 15), datetime(2024, 10, 20)
+    expected = {}
+    for trans in transactions:
+        if start_date <= trans.date_time <= end_date:
+            month = expected.setdefault((trans.date_time.year, trans.date_time.month), [0.0, 0])
+            month[0] += trans.amount
+            month[1] += 1
+
+    summary = snapshot.monthly_summary(start_date, end_date)
+    assert [(year, month) for year, month, _, _ in summary] == sorted(expected)
+    for year, month, total, count in summary:
+        assert total == pytest.approx(expected[(year, month)][0])
+        assert count == expected[(year, month)][1]
+
+
+def test_open_snapshot_remaps_replaced_file(tmp_path, transactions):
+    filename = str(tmp_path / 'transactions.snapshot')
+    assert open_snapshot(filename) is None
+
+    write_snapshot(transactions, filename)
+    shared = open_snapshot(filename)
+    assert open_snapshot(filename) is shared
+
+    write_snapshot(transactions[:10], filename)
+    assert open_snapshot(filename).count == 10
+
+
+@pytest.mark.parametrize('term', ['jane', 'GREEN', 'bundles', 'transferred, message 12', 'é', 'absent'])
+def test_search_matches_database(app, snapshot, term):
+    expected = [
+        comparable(t.to_dict()) for t in Transaction.query.filter(
+            or_(
+                Transaction.sender.ilike(f'%{term}%'),
+                Transaction.receiver.ilike(f'%{term}%'),
+                Transaction.category.ilike(f'%{term}%'),
+                Transaction.raw_message.ilike(f'%{term}%')
+            )
+        ).order_by(desc(Transaction.date_time))
+    ]
+
+    rows = [comparable(snapshot.row(i)) for i in snapshot.search(term)]
+    assert [row['date_time'] for row in rows] == [row['date_time'] for row in expected]
+    assert sorted(rows, key=lambda row: row['raw_message']) == \
+        sorted(expected, key=lambda row: row['raw_message'])
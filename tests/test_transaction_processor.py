@@ -0,0 +1,234 @@
+#test_transaction_processor.py
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pytest
+
+from app.amount_sketch import load_sketch_sets
+from app.balance_index import BalanceIndex
+from app.snapshot import TransactionSnapshot
+from app.transaction_processor import (
+    TransactionProcessor, shared_processor,
+    BALANCE_INDEX_FILENAME, SKETCH_FILENAME, SNAPSHOT_FILENAME
+)
+
+SAMPLE_XML = os.path.join(os.path.dirname(__file__), 'data', 'sms_sample.xml')
+
+
+@pytest.fixture
+def messages(tmp_path):
+    return TransactionProcessor(str(tmp_path / 'parse')).parse_xml(SAMPLE_XML)
+
+
+def dead_letter_outcomes(processor):
+    return sorted(
+        (entry['raw_message'], entry['reason'], entry['count'])
+        for entry in processor.load_dead_letters()
+    )
+
+
+@pytest.mark.parametrize('cache_size', [1024, 4])
+def test_cached_extraction_matches_uncached(tmp_path, messages, cache_size):
+    cached = TransactionProcessor(str(tmp_path / 'cached'), template_cache_size=cache_size)
+    uncached = TransactionProcessor(str(tmp_path / 'uncached'), template_cache_size=0)
+
+    assert cached.extract_all(messages) == uncached.extract_all(messages)
+    assert dead_letter_outcomes(cached) == dead_letter_outcomes(uncached)
+
+    stats = cached.cache_stats()
+    assert stats['hits'] > 0
+    assert stats['hits'] + stats['misses'] == len(messages)
+    assert stats['size'] <= cache_size
+    assert uncached.cache_stats()['hits'] == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path, messages):
+    processor = TransactionProcessor(str(tmp_path), template_cache_size=2)
+    processor.extract_all(messages)
+
+    stats = processor.cache_stats()
+    assert stats['size'] == 2
+    assert stats['evictions'] == stats['misses'] - 2
+
+
+def test_shared_processor_keeps_cache_warm(tmp_path, messages):
+    output_dir = str(tmp_path / 'shared')
+    processor = shared_processor(output_dir)
+    assert shared_processor(os.path.join(output_dir, '.')) is processor
+
+    processor.extract_all(messages)
+    misses = processor.cache_stats()['misses']
+    shared_processor(output_dir).extract_all(messages)
+    assert processor.cache_stats()['misses'] == misses
+
+
+def write_xml(path, messages):
+    root = ET.Element('smses')
+    for message in messages:
+        ET.SubElement(root, 'sms', body=message)
+    ET.ElementTree(root).write(str(path), encoding='utf-8')
+    return str(path)
+
+
+def in_month(processor, messages, month):
+    return [
+        message for message in messages
+        if (trans := processor.extract_transaction_details(message)) is not None
+        and trans.date_time is not None and trans.date_time.strftime('%Y-%m') == month
+    ]
+
+
+def test_reprocessing_a_month_prunes_only_its_shards(tmp_path, messages):
+    processor = TransactionProcessor(str(tmp_path / 'output'))
+    processor.process_file(SAMPLE_XML)
+    manifest = processor.load_manifest()
+    assert sorted(manifest) == ['2024-05', '2024-06', '2024-07', '2024-10']
+
+    # June again, with a single category left
+    june = [m for m in in_month(processor, messages, '2024-06') if 'Airtime' in m]
+    processor.process_file(write_xml(tmp_path / 'june.xml', june))
+
+    updated = processor.load_manifest()
+    assert list(updated['2024-06']) == ['AIRTIME_PAYMENTS']
+    assert updated['2024-06']['AIRTIME_PAYMENTS']['count'] == len(june)
+    for category, entry in manifest['2024-06'].items():
+        if category != 'AIRTIME_PAYMENTS':
+            assert not os.path.exists(os.path.join(processor.output_dir, entry['file']))
+    assert {month: updated[month] for month in updated if month != '2024-06'} == \
+        {month: manifest[month] for month in manifest if month != '2024-06'}
+
+
+def test_load_from_file_opens_only_matching_shards(tmp_path):
+    processor = TransactionProcessor(str(tmp_path / 'output'))
+    processor.process_file(SAMPLE_XML)
+    manifest = processor.load_manifest()
+
+    # Shards outside the requested range must not be opened
+    for month in ('2024-05', '2024-10'):
+        for entry in manifest[month].values():
+            os.remove(os.path.join(processor.output_dir, entry['file']))
+
+    records = processor.load_from_file(datetime(2024, 6, 15), datetime(2024, 7, 10, 12))
+    assert records
+    assert all('2024-06-15' <= record['datetime'] <= '2024-07-10T12:00:00' for record in records)
+
+    bundles = processor.load_from_file(datetime(2024, 6, 1), datetime(2024, 7, 31), category='BUNDLES')
+    assert {record['category'] for record in bundles} == {'BUNDLES'}
+    assert len(bundles) == sum(
+        manifest[month].get('BUNDLES', {}).get('count', 0) for month in ('2024-06', '2024-07')
+    )
+
+
+def test_replacing_months_matches_full_rebuild(tmp_path, messages, monkeypatch):
+    processor = TransactionProcessor(str(tmp_path / 'output'))
+    processor.process_file(SAMPLE_XML)
+    july = in_month(processor, messages, '2024-07')[::2]
+
+    # Reprocessing one month must not read back the other months' shards
+    with monkeypatch.context() as patch:
+        patch.setattr(processor, 'load_from_file', pytest.fail)
+        processor.process_file(write_xml(tmp_path / 'july.xml', july))
+
+    stored = processor.load_transactions()
+    sketches = load_sketch_sets(os.path.join(processor.output_dir, SKETCH_FILENAME))
+    expected = processor.build_amount_sketches(stored)
+    assert {group: sorted(keys) for group, keys in sketches.items()} == \
+        {group: sorted(keys) for group, keys in expected.items()}
+    for group, keyed in expected.items():
+        for key, sketch in keyed.items():
+            assert sketches[group][key].positive_bins == sketch.positive_bins
+            assert sketches[group][key].count == sketch.count
+            assert sketches[group][key].total == pytest.approx(sketch.total)
+
+    index = BalanceIndex.load(os.path.join(processor.output_dir, BALANCE_INDEX_FILENAME))
+    reference = BalanceIndex.from_transactions(stored)
+    assert index.timestamps == reference.timestamps
+    assert sorted(zip(index.timestamps, index.balances)) == \
+        sorted(zip(reference.timestamps, reference.balances))
+
+    snapshot = TransactionSnapshot(os.path.join(processor.output_dir, SNAPSHOT_FILENAME))
+    assert sorted(snapshot.record(i).raw_message for i in range(snapshot.count)) == \
+        sorted(t.raw_message for t in stored)
+
+
+def test_process_file_removes_legacy_category_files(tmp_path):
+    output_dir = tmp_path / 'output'
+    output_dir.mkdir()
+    (output_dir / 'bundles.json').write_text('[]')
+    (output_dir / 'uncategorized.json').write_text('[]')
+
+    TransactionProcessor(str(output_dir)).process_file(SAMPLE_XML)
+    assert not (output_dir / 'bundles.json').exists()
+    assert not (output_dir / 'uncategorized.json').exists()
+
+
+REPEATED = (
+    "*165*S*10000 RWF transferred to Samuel Carter (250791666666) from 36521838 at "
+    "2024-05-11 20:34:47 . Fee was: 100 RWF. New balance: 28300 RWF."
+)
+REPEATED_TXID = (
+    "*162*TxId:14324965479*S*Your payment of 2000 RWF to Bundles and Packs with token  "
+    "has been completed at 2024-06-11 06:26:11. Fee was 0 RWF. Your new balance: 350 RWF"
+)
+
+
+def test_ingest_matches_repeated_messages_by_occurrence(tmp_path, messages):
+    processor = TransactionProcessor(str(tmp_path))
+    assert len(processor.ingest_messages(messages + [REPEATED] * 3)) == \
+        len(processor.extract_all(messages)) + 3
+    assert processor.ingest_messages(messages + [REPEATED] * 3) == []
+
+    added = processor.ingest_messages([REPEATED] * 4)
+    assert [t.raw_message for t in added] == [REPEATED]
+    stored = processor.load_transactions()
+    assert sum(t.raw_message == REPEATED for t in stored) == 4
+
+
+def test_ingest_collapses_repeated_txid(tmp_path):
+    processor = TransactionProcessor(str(tmp_path))
+    assert len(processor.ingest_messages([REPEATED_TXID] * 3)) == 1
+    assert processor.ingest_messages([REPEATED_TXID]) == []
+    assert sum(t.raw_message == REPEATED_TXID for t in processor.load_transactions()) == 1
+
+
+def test_undated_messages_are_quarantined(tmp_path, messages):
+    processor = TransactionProcessor(str(tmp_path))
+    transactions = processor.ingest_messages(messages)
+    assert all(t.date_time is not None for t in transactions)
+
+    undated = [e for e in processor.load_dead_letters() if e['reason'] == 'undated']
+    assert undated
+    repeated = [e for e in undated if '500FRW(800MB)' in e['raw_message']]
+    assert [e['count'] for e in repeated] == [4]
+
+
+def test_dead_letters_are_deduplicated_and_kept_across_runs(tmp_path, messages):
+    processor = TransactionProcessor(str(tmp_path / 'output'))
+    processor.ingest_messages(messages)
+    entries = dead_letter_outcomes(processor)
+    processor.ingest_messages(messages)
+    assert dead_letter_outcomes(processor) == entries
+
+    # Reprocessing other messages leaves earlier quarantines alone
+    june = in_month(processor, messages, '2024-06')
+    processor.process_file(write_xml(tmp_path / 'june.xml', june))
+    assert dead_letter_outcomes(processor) == entries
+
+    processor.replay_dead_letters()
+    assert dead_letter_outcomes(processor) == entries
+    assert processor.dead_letter_count == sum(count for _, _, count in entries)
+
+
+def test_replay_failure_keeps_the_quarantine(tmp_path, messages):
+    processor = TransactionProcessor(str(tmp_path))
+    processor.ingest_messages(messages)
+    entries = dead_letter_outcomes(processor)
+
+    def fail(resolved, added):
+        raise RuntimeError('database unavailable')
+
+    with pytest.raises(RuntimeError):
+        processor.replay_dead_letters(on_resolved=fail)
+    assert dead_letter_outcomes(processor) == entries
+    assert os.listdir(str(tmp_path)).count('dead_letter.ndjson.replay') == 0